@@ -0,0 +1,36 @@
+import argparse
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+def rebuild(args) -> int:
+    request = urllib.request.Request(
+        f"{args.url.rstrip('/')}/admin/rebuild?source={args.source}",
+        method="POST",
+        headers={"X-Admin-Token": args.token},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=args.timeout) as response:
+            print(json.dumps(json.load(response)))
+            return 0
+    except urllib.error.HTTPError as error:
+        print(f"rebuild failed: {error.code} {error.read().decode('utf-8', 'replace')}", file=sys.stderr)
+        return 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Administer a running order service.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", default=os.environ.get("ADMIN_TOKEN", ""))
+    parser.add_argument("--timeout", type=float, default=600)
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = commands.add_parser("rebuild", help="Rebuild the read model and swap it in.")
+    rebuild_parser.add_argument("--source", choices=["write", "events"], default="write",
+                                help="Rebuild from the write model or by replaying the event store.")
+    rebuild_parser.set_defaults(run=rebuild)
+    args = parser.parse_args()
+    sys.exit(args.run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from command.commands import CreateOrderCommand
+from command.handlers import OrderCommandHandler
+from db.read_db import ReadDB
+from db.sharded import ShardedReadDB, ShardedWriteDB
+from db.write_db import WriteDB
+from events.bus import EventBus
+from query.projections import ReadModelProjection
+
+def build(shards: int):
+    if shards:
+        write_db, read_db = ShardedWriteDB(shards), ShardedReadDB(shards)
+    else:
+        write_db, read_db = WriteDB(), ReadDB()
+    bus = EventBus()
+    ReadModelProjection(read_db).subscribe(bus)
+    return OrderCommandHandler(write_db, bus), read_db
+
+def run(shards: int, threads: int, orders: int, reads: int) -> float:
+    handler, read_db = build(shards)
+    commands = [CreateOrderCommand(id=str(uuid4()), customer="c", items=["a", "b"]) for _ in range(orders)]
+
+    # One task per order: create it, then read it back a few times, like the
+    # POST and GET endpoints running side by side on Starlette's threadpool.
+    def task(command: CreateOrderCommand):
+        handler.handle_create_order(command)
+        for _ in range(reads):
+            read_db.get_by_id(command.id)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in pool.map(task, commands, chunksize=64):
+            pass
+    return orders / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Order throughput as the threadpool grows.")
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--reads", type=int, default=4, help="get_by_id calls per created order")
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16, 40])
+    args = parser.parse_args()
+
+    print(f"{args.orders} orders, {args.reads} reads each")
+    print(f"{'threads':>7} {'unsharded ops/s':>16} {f'{args.shards} shards ops/s':>16}")
+    for threads in args.threads:
+        plain = run(0, threads, args.orders, args.reads)
+        sharded = run(args.shards, threads, args.orders, args.reads)
+        print(f"{threads:>7} {plain:>16,.0f} {sharded:>16,.0f}")
+
+if __name__ == "__main__":
+    main()
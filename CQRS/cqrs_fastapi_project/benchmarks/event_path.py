@@ -0,0 +1,41 @@
+import argparse
+import time
+from uuid import uuid4
+
+from command.commands import CreateOrderCommand
+from command.handlers import OrderCommandHandler
+from db.read_db import ReadDB
+from db.write_db import WriteDB
+from events.bus import EventBus
+from query.projections import ReadModelProjection
+
+def cpu_per_order(commands, trusted: bool) -> float:
+    bus = EventBus()
+    ReadModelProjection(ReadDB()).subscribe(bus)
+    handler = OrderCommandHandler(WriteDB(), bus, trusted_events=trusted)
+    start = time.process_time()
+    for command in commands:
+        handler.handle_create_order(command)
+    return (time.process_time() - start) / len(commands)
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU cost of creating one order, command to read model.")
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--items", type=int, default=5, help="items per order")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    items = [f"item-{i}" for i in range(args.items)]
+    commands = [
+        CreateOrderCommand(id=str(uuid4()), customer=f"customer-{i % 1000}", items=items)
+        for i in range(args.orders)
+    ]
+    # Best of several rounds, to keep GC and warm-up noise out of the comparison.
+    validated = min(cpu_per_order(commands, trusted=False) for _ in range(args.rounds))
+    trusted = min(cpu_per_order(commands, trusted=True) for _ in range(args.rounds))
+    print(f"{args.orders} orders, {args.items} items each")
+    print(f"validated events: {validated * 1e6:7.2f} us/order")
+    print(f"trusted events:   {trusted * 1e6:7.2f} us/order ({trusted / validated:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from main import app
+
+ROUTES = ("POST /orders", "GET /orders", "GET /orders/{id}")
+
+def parse_mix(value: str) -> Dict[str, float]:
+    names = {"post": ROUTES[0], "list": ROUTES[1], "get": ROUTES[2]}
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        mix[names[name.strip()]] = float(weight)
+    return mix
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    routes, weights = list(mix), list(mix.values())
+    latencies: Dict[str, List[float]] = {route: [] for route in routes}
+    errors: Dict[str, int] = {route: 0 for route in routes}
+    rng = random.Random(args.seed)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        seeded = await client.post("/orders/batch", json=[
+            {"customer": f"customer-{i % 1000}", "items": ["book", "pen"]} for i in range(args.seed_orders)
+        ])
+        ids = seeded.json()["ids"] if args.seed_orders else []
+        list_params = {"limit": args.list_limit} if args.list_limit else {}
+
+        async def call(route: str) -> httpx.Response:
+            if route == ROUTES[0]:
+                response = await client.post("/orders", json={"customer": f"customer-{rng.randrange(1000)}", "items": ["book"]})
+                if response.status_code == 200:
+                    ids.append(response.json()["id"])
+                return response
+            if route == ROUTES[1]:
+                return await client.get("/orders", params=list_params)
+            return await client.get(f"/orders/{rng.choice(ids)}")
+
+        deadline = time.perf_counter() + args.duration
+        remaining = [args.requests]
+
+        async def worker():
+            while time.perf_counter() < deadline and (args.requests == 0 or remaining[0] > 0):
+                remaining[0] -= 1
+                route = rng.choices(routes, weights)[0]
+                if route == ROUTES[2] and not ids:
+                    route = ROUTES[0]
+                start = time.perf_counter()
+                response = await call(route)
+                latencies[route].append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors[route] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    report = {"config": vars(args), "elapsed_s": elapsed, "routes": {}}
+    for route in routes:
+        values = sorted(latencies[route])
+        report["routes"][route] = {
+            "requests": len(values),
+            "errors": errors[route],
+            "throughput_rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    return report
+
+def compare(report: dict, baseline: dict, max_regression: float) -> bool:
+    ok = True
+    print(f"\n{'route':<18} {'rps change':>11} {'p99 change':>11}")
+    for route, current in report["routes"].items():
+        before = baseline["routes"].get(route)
+        if not before or not before["throughput_rps"] or not before["p99_ms"]:
+            continue
+        rps = current["throughput_rps"] / before["throughput_rps"] - 1
+        p99 = current["p99_ms"] / before["p99_ms"] - 1
+        flag = ""
+        if rps < -max_regression or p99 > max_regression:
+            flag, ok = "  REGRESSION", False
+        print(f"{route:<18} {rps:>+10.1%} {p99:>+10.1%}{flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the app in-process and report latency per route.")
+    parser.add_argument("--mix", default="post=1,list=1,get=8", help="relative weights of post, list and get")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = no limit)")
+    parser.add_argument("--seed-orders", type=int, default=1000, help="orders created before measuring")
+    parser.add_argument("--list-limit", type=int, default=100, help="limit for GET /orders (0 = whole table)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="fail if throughput drops or p99 grows by more than this fraction")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"{'route':<18} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in report["routes"].items():
+        print(f"{route:<18} {r['requests']:>9} {r['errors']:>7} {r['throughput_rps']:>9.0f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.max_regression):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import gc
+import random
+import tracemalloc
+from uuid import uuid4
+
+from models.order import Order
+from db.write_db import WriteDB
+from db.read_db import ReadDB
+from db.compact import CompactWriteDB, CompactReadDB
+
+STORES = {
+    "WriteDB": (WriteDB, "save"),
+    "ReadDB": (ReadDB, "update"),
+    "CompactWriteDB": (CompactWriteDB, "save"),
+    "CompactReadDB": (CompactReadDB, "update"),
+}
+
+def make_rows(count: int, customers: int, items: int):
+    rng = random.Random(42)
+    customer_names = [f"customer-{i}" for i in range(customers)]
+    item_names = [f"item-{i}" for i in range(items)]
+    return [
+        (str(uuid4()), rng.choice(customer_names), rng.sample(item_names, rng.randint(1, 5)))
+        for _ in range(count)
+    ]
+
+def measure(store_cls, method: str, rows) -> float:
+    # The input strings are created before tracing starts, so only what each
+    # store keeps alive (models, lists, dicts, arrays) is counted.
+    gc.collect()
+    tracemalloc.start()
+    store = store_cls()
+    put = getattr(store, method)
+    for order_id, customer, items in rows:
+        put(Order(id=order_id, customer=customer, items=items))
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return used / len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes retained per order by each store.")
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, default=1_000)
+    parser.add_argument("--items", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = make_rows(args.orders, args.customers, args.items)
+    print(f"{args.orders} orders, {args.customers} customers, {args.items} distinct items")
+    results = {name: measure(cls, method, rows) for name, (cls, method) in STORES.items()}
+    for name, per_order in results.items():
+        print(f"{name:<16} {per_order:8.1f} bytes/order")
+    for side in ("WriteDB", "ReadDB"):
+        print(f"{side}: compact uses {results['Compact' + side] / results[side]:.0%} of the default store")
+
+if __name__ == "__main__":
+    main()
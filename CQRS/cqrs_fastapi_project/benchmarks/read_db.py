@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from uuid import uuid4
+
+from models.order import Order
+from db.read_db import ReadDB
+from db.sqlite_read_db import SQLiteReadDB
+from db.tiered_read_db import TieredReadDB
+
+def timed(label: str, count: int, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<26} {elapsed * 1e6 / count:10.2f} us/op")
+
+def run(name: str, db, orders, args):
+    rng = random.Random(1)
+    ids = [order.id for order in orders]
+    print(name)
+    timed("update_many (per order)", len(orders), lambda: [
+        db.update_many(orders[i:i + args.batch]) for i in range(0, len(orders), args.batch)
+    ])
+    timed("get_by_id", args.lookups, lambda: [db.get_by_id(rng.choice(ids)) for _ in range(args.lookups)])
+    timed("get_json", args.lookups, lambda: [db.get_json(rng.choice(ids)) for _ in range(args.lookups)])
+    newest = ids[-len(ids) // 10:]
+    timed("get_json (newest 10%)", args.lookups, lambda: [db.get_json(rng.choice(newest)) for _ in range(args.lookups)])
+    timed("get_by_customer", args.queries, lambda: [
+        db.get_by_customer(f"customer-{rng.randrange(args.customers)}") for _ in range(args.queries)
+    ])
+    timed("get_page (100)", args.queries, lambda: [db.get_page(rng.choice(ids), 100) for _ in range(args.queries)])
+    times = [order.created_at for order in orders]
+    timed("get_created_between (100)", args.queries, lambda: [
+        db.get_created_between(rng.choice(times), None, 100) for _ in range(args.queries)
+    ])
+    timed("get_latest (20)", args.queries, lambda: [db.get_latest(20) for _ in range(args.queries)])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the dict, SQLite and tiered read models.")
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=1_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--cache-bytes", type=int, default=8 * 1024 * 1024, help="cache ceiling for TieredReadDB")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = time.time()
+    orders = [
+        Order(id=str(uuid4()), customer=f"customer-{rng.randrange(args.customers)}",
+              items=[f"item-{rng.randrange(500)}" for _ in range(rng.randint(1, 5))],
+              created_at=start + i * 0.001)
+        for i in range(args.orders)
+    ]
+    print(f"{args.orders} orders, {args.customers} customers")
+    run("ReadDB (dict)", ReadDB(), orders, args)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteReadDB(os.path.join(tmp, "read_model.db"))
+        run("SQLiteReadDB", db, orders, args)
+        db.close()
+        db = TieredReadDB(SQLiteReadDB(os.path.join(tmp, "tiered.db")), args.cache_bytes)
+        run("TieredReadDB", db, orders, args)
+        print(f"  {db.stats()}")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import random
+import time
+from functools import partial
+from uuid import uuid4
+
+from models.order import Order
+from db.read_db import ReadDB
+from db.compact import CompactReadDB
+from query.rebuild import rebuild_read_db
+
+def timed(label: str, orders, factory, partitions: int, workers: int):
+    start = time.perf_counter()
+    db = rebuild_read_db(orders, factory, partitions, workers)
+    elapsed = time.perf_counter() - start
+    assert len(db.get_all()) == len(orders)
+    print(f"  {label:<32} {elapsed:8.3f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a read model rebuild against the number of worker processes.")
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    orders = [
+        Order(id=str(uuid4()), customer=f"customer-{rng.randrange(10_000)}",
+              items=[f"item-{rng.randrange(500)}" for _ in range(rng.randint(1, 5))])
+        for _ in range(args.orders)
+    ]
+    print(f"{args.orders} orders")
+    timed("ReadDB, in-process", orders, partial(ReadDB), 1, 0)
+    timed("CompactReadDB, in-process", orders, CompactReadDB, 1, 0)
+    for workers in args.workers:
+        timed(f"CompactReadDB, {workers} workers", orders, CompactReadDB, workers, workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import random
+import time
+from uuid import uuid4
+
+from models.order import Order
+from db.search_db import OrderSearchDB, tokenize
+
+FIRST = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi", "ivan", "judy", "mallory", "oscar"]
+ITEMS = ["book", "pen", "pencil", "paper", "notebook", "stapler", "marker", "eraser", "folder", "binder"]
+
+def scan(orders, q: str, limit: int):
+    # What the search replaces: a pass over every order in the read model.
+    terms = tokenize(q)
+    hits = []
+    for order in orders:
+        text = " ".join([order.customer, *order.items]).casefold()
+        if all(term in text for term in terms):
+            hits.append(order)
+            if len(hits) == limit:
+                break
+    return hits
+
+def timed(label: str, count: int, fn):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<36} {elapsed * 1e3 / count:10.3f} ms/query")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time order search against a full scan.")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    customers = [f"{rng.choice(FIRST)} {uuid4().hex[:8]}" for _ in range(args.customers)]
+    orders = [
+        Order(id=str(uuid4()), customer=rng.choice(customers),
+              items=[f"{rng.choice(ITEMS)}-{rng.randrange(1000)}" for _ in range(rng.randint(1, 4))])
+        for _ in range(args.orders)
+    ]
+    db = OrderSearchDB()
+    start = time.perf_counter()
+    db.add_many(orders)
+    print(f"{args.orders} orders indexed in {time.perf_counter() - start:.1f}s, {len(db.tokens)} tokens")
+
+    sample = [rng.choice(customers).split()[1] for _ in range(args.queries)]
+    queries = {
+        "customer id prefix (4 chars)": [c[:4] for c in sample],
+        "customer name + id prefix": [f"{rng.choice(FIRST)} {c[:3]}" for c in sample],
+        "item keyword + number": [f"{rng.choice(ITEMS)} {rng.randrange(1000)}" for _ in sample],
+        "common word (grace)": ["grace"] * args.queries,
+    }
+    for label, qs in queries.items():
+        it = iter(qs * 2)
+        timed(f"index: {label}", args.queries, lambda: db.search(next(it), args.limit))
+    it = iter(queries["customer id prefix (4 chars)"])
+    timed("scan: customer id prefix (4 chars)", max(1, args.queries // 50), lambda: scan(orders, next(it), args.limit))
+
+if __name__ == "__main__":
+    main()
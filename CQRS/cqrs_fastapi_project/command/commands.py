@@ -5,3 +5,12 @@ class CreateOrderCommand(BaseModel):
     id: str
     customer: str
     items: List[str]
+
+class CreateOrdersBatchCommand(BaseModel):
+    orders: List[CreateOrderCommand]
+
+class ConfirmOrderCommand(BaseModel):
+    id: str
+
+class CancelOrderCommand(BaseModel):
+    id: str
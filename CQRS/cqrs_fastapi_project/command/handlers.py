@@ -1,16 +1,139 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple, Union
 from db.write_db import WriteDB
-from events.bus import EventBus
-from events.events import DomainEvent, ORDER_CREATED
-from command.commands import CreateOrderCommand
+from db.sharded import ShardedWriteDB, shard_of
+from events.bus import AsyncEventBus, EventBus
+from events.events import DomainEvent, TrustedEvent, ORDER_CREATED, ORDERS_CREATED, ORDER_STATUS_CHANGED
+from events.store import EventStore
+from command.commands import CreateOrderCommand, CreateOrdersBatchCommand, ConfirmOrderCommand, CancelOrderCommand
 from models.order import Order
 
+TRANSITIONS = {
+    "CREATED": {"CONFIRMED", "CANCELLED"},
+    "CONFIRMED": {"CANCELLED"},
+}
+
+class OrderNotFound(Exception):
+    pass
+
+class InvalidTransition(Exception):
+    pass
+
 class OrderCommandHandler:
-    def __init__(self, db: WriteDB, bus: EventBus):
+    def __init__(self, db: WriteDB, bus: EventBus, store: Optional[EventStore] = None,
+                 trusted_events: bool = True, clock: Callable[[], float] = time.time):
         self.db = db
         self.bus = bus
+        self.store = store
+        self.trusted_events = trusted_events
+        self.clock = clock
+        # Striped by order id so two transitions of one order can't both pass the check.
+        self._status_locks = [threading.Lock() for _ in range(64)]
 
     def handle_create_order(self, command: CreateOrderCommand):
-        order = Order(id=command.id, customer=command.customer, items=command.items)
-        self.db.save(order)
-        event = DomainEvent(type=ORDER_CREATED, payload=order.dict())
+        self.bus.publish(self._create_order(command))
+
+    def handle_create_orders(self, command: CreateOrdersBatchCommand) -> List[str]:
+        event, order_ids = self._create_orders(command)
         self.bus.publish(event)
+        return order_ids
+
+    def handle_confirm_order(self, command: ConfirmOrderCommand) -> dict:
+        event = self._change_status(command.id, "CONFIRMED")
+        self.bus.publish(event)
+        return event.payload
+
+    def handle_cancel_order(self, command: CancelOrderCommand) -> dict:
+        event = self._change_status(command.id, "CANCELLED")
+        self.bus.publish(event)
+        return event.payload
+
+    # The _create and _change methods commit a command and return the event
+    # to publish; the sync and async handlers differ only in how they publish.
+    def _create_order(self, command: CreateOrderCommand) -> Union[DomainEvent, TrustedEvent]:
+        order = Order(id=command.id, customer=command.customer, items=command.items, created_at=self.clock())
+        self.db.save(order)
+        event = self._event(ORDER_CREATED, order)
+        self._record(event)
+        return event
+
+    def _create_orders(self, command: CreateOrdersBatchCommand) -> Tuple[Union[DomainEvent, TrustedEvent], List[str]]:
+        # The commands were validated as one batch and carry the same field
+        # types as Order, so the orders are built without validating again.
+        # The whole batch shares one creation time.
+        created_at = self.clock()
+        orders = [
+            Order.model_construct(id=c.id, customer=c.customer, items=tuple(c.items), created_at=created_at)
+            for c in command.orders
+        ]
+        self.db.save_many(orders)
+        event = self._event(ORDERS_CREATED, {"orders": orders})
+        self._record(event)
+        return event, [order.id for order in orders]
+
+    def _change_status(self, order_id: str, status: str) -> DomainEvent:
+        with self._status_locks[shard_of(order_id, len(self._status_locks))]:
+            order = self.db.get(order_id)
+            if order is None:
+                raise OrderNotFound(order_id)
+            if status not in TRANSITIONS.get(order.status, ()):
+                raise InvalidTransition(f"Cannot change order from {order.status} to {status}")
+            delta = {"id": order_id, "status": status, "version": order.version + 1}
+            self.db.set_status(order_id, status, delta["version"])
+            event = DomainEvent(type=ORDER_STATUS_CHANGED, payload=delta)
+            self._record(event)
+        return event
+
+    def _event(self, event_type: str, model: Any) -> Union[DomainEvent, TrustedEvent]:
+        event = TrustedEvent(event_type, model)
+        return event if self.trusted_events else event.to_domain_event()
+
+    def _record(self, event: Union[DomainEvent, TrustedEvent]):
+        if self.store is None:
+            return
+        seq = self.store.append(event)
+        if self.store.claim_snapshot(seq):
+            self.store.save_snapshot(seq, self.db.snapshot())
+
+class AsyncOrderCommandHandler(OrderCommandHandler):
+    # Same commands, awaited on the event loop and published to an
+    # AsyncEventBus. An in-memory write side is updated inline; with an event
+    # store every commit goes to a thread, since append may fsync. Those
+    # threads run concurrently, so unless the write model is sharded, and
+    # so locks on its own, commits take one lock, which also keeps the
+    # snapshot copy from seeing a half-applied write.
+    def __init__(self, db: WriteDB, bus: AsyncEventBus, store: Optional[EventStore] = None,
+                 trusted_events: bool = True, clock: Callable[[], float] = time.time):
+        super().__init__(db, bus, store, trusted_events, clock)
+        self._commit_lock = None if isinstance(db, ShardedWriteDB) else threading.Lock()
+
+    async def handle_create_order(self, command: CreateOrderCommand):
+        await self.bus.publish(await self._commit(self._create_order, command))
+
+    async def handle_create_orders(self, command: CreateOrdersBatchCommand) -> List[str]:
+        event, order_ids = await self._commit(self._create_orders, command)
+        await self.bus.publish(event)
+        return order_ids
+
+    async def handle_confirm_order(self, command: ConfirmOrderCommand) -> dict:
+        event = await self._commit(self._change_status, command.id, "CONFIRMED")
+        await self.bus.publish(event)
+        return event.payload
+
+    async def handle_cancel_order(self, command: CancelOrderCommand) -> dict:
+        event = await self._commit(self._change_status, command.id, "CANCELLED")
+        await self.bus.publish(event)
+        return event.payload
+
+    async def _commit(self, fn: Callable, *args):
+        if self.store is None:
+            return fn(*args)
+        return await asyncio.to_thread(self._locked, fn, *args)
+
+    def _locked(self, fn: Callable, *args):
+        if self._commit_lock is None:
+            return fn(*args)
+        with self._commit_lock:
+            return fn(*args)
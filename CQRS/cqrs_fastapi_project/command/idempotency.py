@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+class IdempotencyKeyReused(Exception):
+    pass
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires", "result", "done", "ready", "waiters")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.expires = float("inf")
+        self.result: Any = None
+        self.done = False
+        self.ready = threading.Event()
+        # Futures of async retries waiting for the first request, resolved
+        # on their own loops when it finishes.
+        self.waiters: List[asyncio.Future] = []
+
+class IdempotencyCache:
+    # Maps an idempotency key to the response of the request that first used
+    # it. Entries are kept in insertion order, which is also expiry order, so
+    # expired and surplus entries are evicted from the front.
+    def __init__(self, max_entries: int = 100_000, ttl: float = 24 * 3600,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self, key: str, request: Any, handler: Callable[[], Any]) -> Any:
+        fingerprint = self._fingerprint(request)
+        while True:
+            entry, owner = self._claim(key, fingerprint)
+            if owner:
+                break
+            # A retry arriving while the first request is still running waits
+            # for it instead of running the command a second time.
+            entry.ready.wait()
+            if entry.done:
+                return entry.result
+        try:
+            result = handler()
+        except BaseException:
+            self._fail(key, entry)
+            raise
+        return self._finish(entry, result)
+
+    async def run_async(self, key: str, request: Any, handler: Callable[[], Awaitable[Any]]) -> Any:
+        fingerprint = self._fingerprint(request)
+        while True:
+            entry, owner = self._claim(key, fingerprint)
+            if owner:
+                break
+            # Awaiting a future holds no thread, so waiting retries can't use
+            # up the executor the first request needs to finish.
+            waiter = self._wait(entry)
+            if waiter is not None:
+                await waiter
+            if entry.done:
+                return entry.result
+        try:
+            result = await handler()
+        except BaseException:
+            self._fail(key, entry)
+            raise
+        return self._finish(entry, result)
+
+    def _fingerprint(self, request: Any) -> str:
+        return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _claim(self, key: str, fingerprint: str) -> Tuple[_Entry, bool]:
+        # Returns the key's entry and whether the caller now owns it and must run the handler.
+        with self._lock:
+            self._evict()
+            entry = self._entries.get(key)
+            if entry is None or (entry.done and entry.expires <= self.clock()):
+                self._entries.pop(key, None)
+                entry = self._entries[key] = _Entry(fingerprint)
+                return entry, True
+        if entry.fingerprint != fingerprint:
+            raise IdempotencyKeyReused(key)
+        return entry, False
+
+    def _wait(self, entry: _Entry) -> Optional[asyncio.Future]:
+        # None if the entry is already settled.
+        with self._lock:
+            if entry.ready.is_set():
+                return None
+            waiter = asyncio.get_running_loop().create_future()
+            entry.waiters.append(waiter)
+            return waiter
+
+    def _finish(self, entry: _Entry, result: Any) -> Any:
+        entry.result, entry.done = result, True
+        entry.expires = self.clock() + self.ttl
+        self._settle(entry)
+        return result
+
+    def _fail(self, key: str, entry: _Entry):
+        # Failures are not remembered, so the client can retry with the same key.
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        self._settle(entry)
+
+    def _settle(self, entry: _Entry):
+        with self._lock:
+            entry.ready.set()
+            waiters, entry.waiters = entry.waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    def _evict(self):
+        now = self.clock()
+        entries = self._entries
+        while entries:
+            key, oldest = next(iter(entries.items()))
+            if len(entries) < self.max_entries and not (oldest.done and oldest.expires <= now):
+                return
+            del entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def _wake(waiter: asyncio.Future):
+    # A retry that was cancelled while waiting has already resolved its future.
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,61 @@
+import os
+
+# "memory" keeps pydantic Orders in dicts; "compact" keeps interned, array-backed columns.
+STORAGE = os.environ.get("STORAGE", "memory")
+# "memory" uses the STORAGE/STORE_SHARDS read model; "sqlite" keeps it in READ_DB_PATH;
+# "shared" maps READ_DB_SHARED_PATH so every uvicorn worker reads the same data;
+# "tiered" caches recently read orders from READ_DB_PATH in memory.
+READ_DB_BACKEND = os.environ.get("READ_DB_BACKEND", "memory")
+READ_DB_PATH = os.environ.get("READ_DB_PATH", "read_model.db")
+READ_DB_SHARED_PATH = os.environ.get("READ_DB_SHARED_PATH", "read_model.mmap")
+# "tiered" is the sqlite read model behind an LRU cache of at most this many bytes.
+READ_DB_CACHE_BYTES = int(os.environ.get("READ_DB_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Split each store into this many lock-striped shards; 0 keeps a single unsynchronized store.
+STORE_SHARDS = int(os.environ.get("STORE_SHARDS", "0"))
+
+EVENT_STORE_DIR = os.environ.get("EVENT_STORE_DIR")
+EVENT_STORE_SEGMENT_BYTES = int(os.environ.get("EVENT_STORE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+EVENT_STORE_FSYNC = os.environ.get("EVENT_STORE_FSYNC", "0") == "1"
+SNAPSHOT_EVERY = int(os.environ.get("SNAPSHOT_EVERY", "100000"))
+
+# 0 keeps dispatch inline with the request; more workers dispatch from a bounded queue.
+BUS_WORKERS = int(os.environ.get("BUS_WORKERS", "0"))
+BUS_QUEUE_SIZE = int(os.environ.get("BUS_QUEUE_SIZE", "10000"))
+BUS_OVERFLOW = os.environ.get("BUS_OVERFLOW", "block")
+BUS_PUT_TIMEOUT = float(os.environ["BUS_PUT_TIMEOUT"]) if os.environ.get("BUS_PUT_TIMEOUT") else None
+
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "1000"))
+NDJSON_CHUNK_SIZE = int(os.environ.get("NDJSON_CHUNK_SIZE", "500"))
+
+# Keep each order's encoded JSON next to it so GET /orders/{id} skips serialization.
+READ_DB_JSON_CACHE = os.environ.get("READ_DB_JSON_CACHE", "0") == "1"
+
+# In-process subscribers receive the validated Order instead of a dict copy to re-validate.
+TRUSTED_EVENTS = os.environ.get("TRUSTED_EVENTS", "1") == "1"
+
+# Changes kept for GET /orders/changes clients resuming with Last-Event-ID.
+CHANGE_FEED_SIZE = int(os.environ.get("CHANGE_FEED_SIZE", "10000"))
+CHANGE_FEED_KEEPALIVE = float(os.environ.get("CHANGE_FEED_KEEPALIVE", "15"))
+
+# The /stats endpoints and their projection, which keeps the status and version
+# of every order. Off by default, so the memory is only spent when they are used.
+STATS_ENABLED = os.environ.get("STATS_ENABLED", "0") == "1"
+# Largest k served by GET /stats/items/top.
+STATS_TOP_K = int(os.environ.get("STATS_TOP_K", "100"))
+
+# GET /orders/search and its projection, an inverted index over every order's
+# customer and item words. Off by default for the same reason.
+SEARCH_ENABLED = os.environ.get("SEARCH_ENABLED", "0") == "1"
+
+# Responses remembered for clients that retry with the same Idempotency-Key.
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "100000"))
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", str(24 * 3600)))
+
+# Per-stage timing histograms served on /metrics. When off, nothing is wrapped.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+# POST /admin/rebuild is refused unless the X-Admin-Token header matches; empty disables it.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+# Processes used to rebuild a sharded compact read model, one shard each at most;
+# the dict model and an unsharded store are rebuilt in-process.
+REBUILD_WORKERS = int(os.environ.get("REBUILD_WORKERS", str(os.cpu_count() or 1)))
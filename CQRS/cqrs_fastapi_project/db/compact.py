@@ -0,0 +1,280 @@
+import copy
+import math
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, get_args
+from models.order import Order, OrderStatus
+from db.indexes import TimeIndex
+from db.write_db import WriteDB
+
+STATUSES: Tuple[str, ...] = get_args(OrderStatus)
+STATUS_CODES: Dict[str, int] = {status: code for code, status in enumerate(STATUSES)}
+
+_NO_TIME = float("nan")
+
+class StringTable:
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self._strings: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    def find(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+    def string(self, code: int) -> str:
+        return self._strings[code]
+
+class OrderTable:
+    # One row per order. Customers and items are stored as codes into a shared
+    # string table, statuses as small ints, and each order's items as a run in
+    # one flat array. Order objects only exist while crossing the API boundary.
+    def __init__(self):
+        self.strings = StringTable()
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.customers = array("I")
+        self.statuses = array("B")
+        self.versions = array("I")
+        self.item_starts = array("I")
+        self.item_counts = array("I")
+        self.item_codes = array("I")
+        # NaN marks an order stored without a creation time.
+        self.created = array("d")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def copy(self) -> "OrderTable":
+        # Column copies are memcpys. The string table only ever grows, so the
+        # copy shares it; codes in the copied columns always resolve.
+        table = OrderTable.__new__(OrderTable)
+        for name, value in vars(self).items():
+            setattr(table, name, value if name == "strings" else copy.copy(value))
+        return table
+
+    def put(self, order: Order) -> Tuple[int, bool]:
+        row = self.rows.get(order.id)
+        customer = self.strings.code(order.customer)
+        status = STATUS_CODES[order.status]
+        if row is None:
+            row = self.rows[order.id] = len(self.ids)
+            self.ids.append(order.id)
+            self.customers.append(customer)
+            self.statuses.append(status)
+            self.versions.append(order.version)
+            self.item_starts.append(len(self.item_codes))
+            self.item_counts.append(len(order.items))
+            self.item_codes.extend(self.strings.code(item) for item in order.items)
+            self.created.append(_NO_TIME if order.created_at is None else order.created_at)
+            return row, True
+        self.customers[row] = customer
+        self.statuses[row] = status
+        self.versions[row] = order.version
+        items = array("I", (self.strings.code(item) for item in order.items))
+        if items != self.item_codes_of(row):
+            # Rewritten items go to the end of the flat array; the old run is left unused.
+            self.item_starts[row] = len(self.item_codes)
+            self.item_counts[row] = len(items)
+            self.item_codes.extend(items)
+        return row, False
+
+    def set_status(self, row: int, status: str, version: int) -> bool:
+        if version <= self.versions[row]:
+            return False
+        self.statuses[row] = STATUS_CODES[status]
+        self.versions[row] = version
+        return True
+
+    def order(self, row: int) -> Order:
+        string = self.strings.string
+        return Order.model_construct(
+            id=self.ids[row],
+            customer=string(self.customers[row]),
+            items=tuple(string(code) for code in self.item_codes_of(row)),
+            status=STATUSES[self.statuses[row]],
+            version=self.versions[row],
+            created_at=self.created_at(row),
+        )
+
+    def created_at(self, row: int) -> Optional[float]:
+        created = self.created[row]
+        return None if math.isnan(created) else created
+
+    def item_codes_of(self, row: int) -> array:
+        start = self.item_starts[row]
+        return self.item_codes[start:start + self.item_counts[row]]
+
+class RowIndex:
+    # Rows per key in the order they were added. Removing a row only counts
+    # it as dead, since finding it in the array would scan every row with
+    # that key; reads skip a dead row's oldest occurrences, which are the
+    # ones removed. A key's array is compacted once half of it is dead.
+    def __init__(self):
+        self._rows: Dict[int, array] = {}
+        self._dead: Dict[int, Dict[int, int]] = {}
+        self._dead_counts: Dict[int, int] = {}
+
+    def add(self, key: int, row: int):
+        rows = self._rows.get(key)
+        if rows is None:
+            rows = self._rows[key] = array("I")
+        rows.append(row)
+
+    def remove(self, key: int, row: int):
+        rows = self._rows.get(key)
+        if rows is None:
+            return
+        dead = self._dead.setdefault(key, {})
+        dead[row] = dead.get(row, 0) + 1
+        count = self._dead_counts[key] = self._dead_counts.get(key, 0) + 1
+        if 2 * count >= len(rows):
+            self._compact(key)
+
+    def rows(self, key: Optional[int]) -> List[int]:
+        if key is None:
+            return []
+        return self._live(key)
+
+    def _live(self, key: int) -> List[int]:
+        rows = self._rows.get(key, ())
+        dead = self._dead.get(key)
+        if not dead:
+            return list(rows)
+        skip = dict(dead)
+        live = []
+        for row in rows:
+            if skip.get(row):
+                skip[row] -= 1
+            else:
+                live.append(row)
+        return live
+
+    def _compact(self, key: int):
+        live = self._live(key)
+        del self._dead[key], self._dead_counts[key]
+        if live:
+            self._rows[key] = array("I", live)
+        else:
+            del self._rows[key]
+
+class CompactWriteDB(WriteDB):
+    def __init__(self):
+        self.table = OrderTable()
+
+    def save(self, order: Order):
+        self.table.put(order)
+
+    def save_many(self, orders: Iterable[Order]):
+        for order in orders:
+            self.table.put(order)
+
+    def set_status(self, order_id: str, status: str, version: int):
+        row = self.table.rows.get(order_id)
+        if row is not None:
+            self.table.set_status(row, status, version)
+
+    def get(self, order_id: str) -> Optional[Order]:
+        row = self.table.rows.get(order_id)
+        return None if row is None else self.table.order(row)
+
+    def all(self) -> List[Order]:
+        return [self.table.order(row) for row in range(len(self.table))]
+
+    def snapshot(self) -> Callable[[], List[dict]]:
+        table = self.table.copy()
+        return lambda: [table.order(row).model_dump() for row in range(len(table))]
+
+class CompactReadDB:
+    def __init__(self):
+        self.table = OrderTable()
+        self._by_customer = RowIndex()
+        self._by_status = RowIndex()
+        self._by_item = RowIndex()
+        self._created: TimeIndex[int] = TimeIndex()
+
+    def update(self, order: Order):
+        table = self.table
+        old_row = table.rows.get(order.id)
+        if old_row is not None:
+            self._unindex(old_row)
+        row, new = table.put(order)
+        if new and order.created_at is not None:
+            self._created.add(order.created_at, row)
+        self._by_customer.add(table.customers[row], row)
+        self._by_status.add(table.statuses[row], row)
+        for code in set(table.item_codes_of(row)):
+            self._by_item.add(code, row)
+
+    def update_many(self, orders: Iterable[Order]):
+        for order in orders:
+            self.update(order)
+
+    def set_status(self, order_id: str, status: str, version: int):
+        row = self.table.rows.get(order_id)
+        if row is None:
+            return
+        old = self.table.statuses[row]
+        if self.table.set_status(row, status, version):
+            self._by_status.remove(old, row)
+            self._by_status.add(self.table.statuses[row], row)
+
+    def get_all(self) -> List[Order]:
+        return self._orders(range(len(self.table)))
+
+    def get_by_id(self, order_id: str) -> Optional[Order]:
+        row = self.table.rows.get(order_id)
+        return None if row is None else self.table.order(row)
+
+    def get_json(self, order_id: str) -> Optional[Tuple[bytes, int]]:
+        order = self.get_by_id(order_id)
+        if order is None:
+            return None
+        return order.model_dump_json().encode("utf-8"), order.version
+
+    def get_page(self, after: Optional[str], limit: Optional[int]) -> List[Order]:
+        start = self._start(after)
+        end = len(self.table) if limit is None else min(start + limit, len(self.table))
+        return self._orders(range(start, end))
+
+    def iter_from(self, after: Optional[str] = None) -> Iterator[Order]:
+        start, end = self._start(after), len(self.table)
+        return (self.table.order(row) for row in range(start, end))
+
+    def get_by_customer(self, customer: str) -> List[Order]:
+        return self._orders(self._by_customer.rows(self.table.strings.find(customer)))
+
+    def get_by_status(self, status: str) -> List[Order]:
+        return self._orders(self._by_status.rows(STATUS_CODES.get(status)))
+
+    def get_by_item(self, item: str) -> List[Order]:
+        return self._orders(self._by_item.rows(self.table.strings.find(item)))
+
+    def get_created_between(self, since: Optional[float], until: Optional[float],
+                            limit: Optional[int] = None) -> List[Order]:
+        return self._orders(self._created.between(since, until, limit))
+
+    def get_latest(self, n: int) -> List[Order]:
+        return self._orders(self._created.latest(n))
+
+    def _unindex(self, row: int):
+        table = self.table
+        self._by_customer.remove(table.customers[row], row)
+        self._by_status.remove(table.statuses[row], row)
+        for code in set(table.item_codes_of(row)):
+            self._by_item.remove(code, row)
+
+    def _start(self, after: Optional[str]) -> int:
+        if after is None:
+            return 0
+        row = self.table.rows.get(after)
+        if row is None:
+            raise ValueError(f"Unknown cursor: {after}")
+        return row + 1
+
+    def _orders(self, rows: Iterable[int]) -> List[Order]:
+        return [self.table.order(row) for row in rows]
@@ -0,0 +1,86 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Generic, List, Optional, TypeVar
+from models.order import Order
+
+# Each index maps a value to the ids of the orders that have it. The inner
+# dicts are used as insertion-ordered sets, so results come back in the
+# order the orders were first indexed and removal stays O(1).
+Index = Dict[str, Dict[str, None]]
+
+class OrderIndexes:
+    def __init__(self):
+        self.by_customer: Index = {}
+        self.by_status: Index = {}
+        self.by_item: Index = {}
+
+    def add(self, order: Order):
+        _add(self.by_customer, order.customer, order.id)
+        _add(self.by_status, order.status, order.id)
+        for item in order.items:
+            _add(self.by_item, item, order.id)
+
+    def remove(self, order: Order):
+        _remove(self.by_customer, order.customer, order.id)
+        _remove(self.by_status, order.status, order.id)
+        for item in order.items:
+            _remove(self.by_item, item, order.id)
+
+    def change_status(self, order_id: str, old: str, new: str):
+        _remove(self.by_status, old, order_id)
+        _add(self.by_status, new, order_id)
+
+    def customer(self, customer: str) -> List[str]:
+        return list(self.by_customer.get(customer, ()))
+
+    def status(self, status: str) -> List[str]:
+        return list(self.by_status.get(status, ()))
+
+    def item(self, item: str) -> List[str]:
+        return list(self.by_item.get(item, ()))
+
+def _add(index: Index, key: str, order_id: str):
+    ids = index.get(key)
+    if ids is None:
+        ids = index[key] = {}
+    ids[order_id] = None
+
+def _remove(index: Index, key: str, order_id: str):
+    ids = index.get(key)
+    if ids is None:
+        return
+    ids.pop(order_id, None)
+    if not ids:
+        del index[key]
+
+K = TypeVar("K")
+
+class TimeIndex(Generic[K]):
+    # Keys sorted by creation time, in two parallel arrays. Orders arrive in
+    # roughly time order, so most inserts are appends; one that arrives late
+    # is placed with bisect. Ranges are [since, until) and cost O(log n + k).
+    def __init__(self):
+        self.times = array("d")
+        self.keys: List[K] = []
+
+    def add(self, created_at: float, key: K):
+        if not self.times or created_at >= self.times[-1]:
+            self.times.append(created_at)
+            self.keys.append(key)
+            return
+        i = bisect_right(self.times, created_at)
+        self.times.insert(i, created_at)
+        self.keys.insert(i, key)
+
+    def between(self, since: Optional[float], until: Optional[float], limit: Optional[int] = None) -> List[K]:
+        start = 0 if since is None else bisect_left(self.times, since)
+        end = len(self.times) if until is None else bisect_left(self.times, until)
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.keys[start:end]
+
+    def latest(self, n: int) -> List[K]:
+        return self.keys[:-n - 1:-1] if n > 0 else []
+
+    def __len__(self) -> int:
+        return len(self.keys)
@@ -1,15 +1,106 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from models.order import Order
+from db.indexes import OrderIndexes, TimeIndex
 
 class ReadDB:
-    def __init__(self):
+    def __init__(self, cache_json: bool = False):
         self.orders_view: Dict[str, Order] = {}
+        self.cache_json = cache_json
+        # Encoded JSON keyed by id, stored with the Order it was encoded from
+        # so an entry written by a reader racing an update is never served.
+        self._json: Dict[str, Tuple[Order, bytes]] = {}
+        self.indexes = OrderIndexes()
+        self.created: TimeIndex[str] = TimeIndex()
+        # Ids in first-insert order; cursors are positions in this list, so
+        # pages stay stable while new orders are appended.
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
 
     def update(self, order: Order):
+        old = self.orders_view.get(order.id)
+        if old is not None:
+            self.indexes.remove(old)
+        else:
+            self._positions[order.id] = len(self._keys)
+            self._keys.append(order.id)
+            if order.created_at is not None:
+                self.created.add(order.created_at, order.id)
         self.orders_view[order.id] = order
+        self.indexes.add(order)
+        self._json.pop(order.id, None)
+
+    def update_many(self, orders: Iterable[Order]):
+        for order in orders:
+            self.update(order)
+
+    def set_status(self, order_id: str, status: str, version: int):
+        # Patches the stored record: the new Order is a shallow copy sharing
+        # the old items, so the cost does not grow with the number of items.
+        old = self.orders_view.get(order_id)
+        if old is None or version <= old.version:
+            return
+        self.orders_view[order_id] = old.model_copy(update={"status": status, "version": version})
+        self.indexes.change_status(order_id, old.status, status)
+        self._json.pop(order_id, None)
 
     def get_all(self) -> List[Order]:
         return list(self.orders_view.values())
 
     def get_by_id(self, order_id: str) -> Optional[Order]:
         return self.orders_view.get(order_id)
+
+    def get_json(self, order_id: str) -> Optional[Tuple[bytes, int]]:
+        order = self.orders_view.get(order_id)
+        if order is None:
+            return None
+        cached = self._json.get(order_id)
+        if cached is not None and cached[0] is order:
+            return cached[1], order.version
+        body = order.model_dump_json().encode("utf-8")
+        if self.cache_json:
+            self._json[order_id] = (order, body)
+        return body, order.version
+
+    def get_page(self, after: Optional[str], limit: Optional[int]) -> List[Order]:
+        start = self._start(after)
+        end = len(self._keys) if limit is None else start + limit
+        orders = self.orders_view
+        return [orders[order_id] for order_id in self._keys[start:end]]
+
+    def iter_from(self, after: Optional[str] = None) -> Iterator[Order]:
+        # The cursor is checked here rather than on first iteration, and the
+        # end is fixed now so the stream is a stable view of the table.
+        return self._iter(self._start(after), len(self._keys))
+
+    def get_by_customer(self, customer: str) -> List[Order]:
+        return self._lookup(self.indexes.customer(customer))
+
+    def get_by_status(self, status: str) -> List[Order]:
+        return self._lookup(self.indexes.status(status))
+
+    def get_by_item(self, item: str) -> List[Order]:
+        return self._lookup(self.indexes.item(item))
+
+    def get_created_between(self, since: Optional[float], until: Optional[float],
+                            limit: Optional[int] = None) -> List[Order]:
+        return self._lookup(self.created.between(since, until, limit))
+
+    def get_latest(self, n: int) -> List[Order]:
+        return self._lookup(self.created.latest(n))
+
+    def _start(self, after: Optional[str]) -> int:
+        if after is None:
+            return 0
+        position = self._positions.get(after)
+        if position is None:
+            raise ValueError(f"Unknown cursor: {after}")
+        return position + 1
+
+    def _iter(self, start: int, end: int) -> Iterator[Order]:
+        keys, orders = self._keys, self.orders_view
+        for i in range(start, end):
+            yield orders[keys[i]]
+
+    def _lookup(self, order_ids: List[str]) -> List[Order]:
+        orders = self.orders_view
+        return [orders[order_id] for order_id in order_ids if order_id in orders]
@@ -0,0 +1,189 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Tuple
+from models.order import Order
+
+_WORD = re.compile(r"[^\W_]+")
+
+# A token found in the customer name counts for more than one found in an
+# item, and a whole-token match for more than a prefix match.
+CUSTOMER_WEIGHT = 2
+ITEM_WEIGHT = 1
+EXACT = 2.0
+PREFIX = 1.0
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.casefold())
+
+class SortedStrings:
+    # A sorted list kept as chunks of at most 2 * load strings, so adding a
+    # new token shifts one short chunk rather than every token after it.
+    def __init__(self, load: int = 512):
+        self.load = load
+        self._chunks: List[List[str]] = []
+        self._maxes: List[str] = []
+        self._size = 0
+
+    def add(self, value: str):
+        self._size += 1
+        if not self._chunks:
+            self._chunks.append([value])
+            self._maxes.append(value)
+            return
+        i = min(bisect_left(self._maxes, value), len(self._chunks) - 1)
+        chunk = self._chunks[i]
+        insort(chunk, value)
+        self._maxes[i] = chunk[-1]
+        if len(chunk) > 2 * self.load:
+            self._chunks[i:i + 1] = [chunk[:self.load], chunk[self.load:]]
+            self._maxes[i:i + 1] = [chunk[self.load - 1], chunk[-1]]
+
+    def prefixed(self, prefix: str) -> Iterator[str]:
+        i = bisect_left(self._maxes, prefix)
+        while i < len(self._chunks):
+            chunk = self._chunks[i]
+            for value in chunk[bisect_left(chunk, prefix):]:
+                if not value.startswith(prefix):
+                    return
+                yield value
+            i += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+class OrderSearchDB:
+    # Inverted indexes from customer and item tokens to order ids, plus the
+    # sorted token list used to expand a prefix into the tokens it matches.
+    # Postings are dicts used as ordered sets, so each lists its orders
+    # oldest first and can be walked newest first without sorting. Only ids
+    # are kept; callers look the orders up in the read model.
+    def __init__(self):
+        self.customer_postings: Dict[str, Dict[str, None]] = {}
+        self.item_postings: Dict[str, Dict[str, None]] = {}
+        self.tokens = SortedStrings()
+        # Indexing sequence per order, which ranks newer orders first on equal
+        # scores, and the weighted tokens each order was indexed under.
+        self._seqs: Dict[str, int] = {}
+        self._tokens_of: Dict[str, Tuple[Tuple[str, int], ...]] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def add(self, order: Order):
+        with self._lock:
+            self._add(order)
+
+    def add_many(self, orders: Iterable[Order]):
+        with self._lock:
+            for order in orders:
+                self._add(order)
+
+    def search(self, q: str, limit: int) -> List[Tuple[str, float]]:
+        # Matching order ids with their scores, best first.
+        terms = list(dict.fromkeys(tokenize(q)))
+        if not terms:
+            return []
+        with self._lock:
+            expanded = {term: list(self.tokens.prefixed(term)) for term in terms}
+            if len(terms) == 1:
+                return self._rank_one(terms[0], expanded[terms[0]], limit)
+            return self._rank_all(terms, expanded, limit)
+
+    def _tiers(self, term: str, tokens: List[str]) -> Dict[float, List[Dict[str, None]]]:
+        # The postings matching one term, grouped by the score they give.
+        tiers: Dict[float, List[Dict[str, None]]] = {}
+        for token in tokens:
+            match = EXACT if token == term else PREFIX
+            for postings, weight in ((self.customer_postings, CUSTOMER_WEIGHT), (self.item_postings, ITEM_WEIGHT)):
+                posting = postings.get(token)
+                if posting:
+                    tiers.setdefault(match * weight, []).append(posting)
+        return tiers
+
+    def _rank_one(self, term: str, tokens: List[str], limit: int) -> List[Tuple[str, float]]:
+        # One term: walk the tiers from the best score down, each newest
+        # first, and stop at limit, so a common word costs no more than a rare one.
+        tiers = self._tiers(term, tokens)
+        ranked: List[Tuple[str, float]] = []
+        seen = set()
+        for score in sorted(tiers, reverse=True):
+            newest = heapq.merge(*(reversed(posting) for posting in tiers[score]),
+                                 key=self._seqs.__getitem__, reverse=True)
+            for order_id in newest:
+                if order_id in seen:
+                    continue
+                seen.add(order_id)
+                ranked.append((order_id, score))
+                if len(ranked) >= limit:
+                    return ranked
+        return ranked
+
+    def _rank_all(self, terms: List[str], expanded: Dict[str, List[str]], limit: int) -> List[Tuple[str, float]]:
+        # Several terms: score every order matching the term with the fewest
+        # orders, then keep those whose own tokens match each other term.
+        tiers = {term: self._tiers(term, expanded[term]) for term in terms}
+        sizes = {term: sum(len(p) for postings in tiers[term].values() for p in postings) for term in terms}
+        terms = sorted(terms, key=sizes.__getitem__)
+        scores: Dict[str, float] = {}
+        for score, postings in tiers[terms[0]].items():
+            for posting in postings:
+                for order_id in posting:
+                    if score > scores.get(order_id, 0):
+                        scores[order_id] = score
+        for term in terms[1:]:
+            narrowed: Dict[str, float] = {}
+            for order_id, score in scores.items():
+                best = self._best_match(order_id, term)
+                if best:
+                    narrowed[order_id] = score + best
+            scores = narrowed
+        # Scores take only a few distinct values, so candidates are bucketed
+        # by score and each bucket is cut down by recency alone.
+        buckets: Dict[float, List[str]] = {}
+        for order_id, score in scores.items():
+            buckets.setdefault(score, []).append(order_id)
+        ranked: List[Tuple[str, float]] = []
+        for score in sorted(buckets, reverse=True):
+            newest = heapq.nlargest(limit - len(ranked), buckets[score], key=self._seqs.__getitem__)
+            ranked.extend((order_id, score) for order_id in newest)
+            if len(ranked) >= limit:
+                break
+        return ranked
+
+    def _best_match(self, order_id: str, term: str) -> float:
+        best = 0.0
+        for token, weight in self._tokens_of[order_id]:
+            if token.startswith(term):
+                best = max(best, (EXACT if token == term else PREFIX) * weight)
+        return best
+
+    def _add(self, order: Order):
+        weights = dict.fromkeys(tokenize(" ".join(order.items)), ITEM_WEIGHT)
+        weights.update(dict.fromkeys(tokenize(order.customer), CUSTOMER_WEIGHT))
+        current = self._tokens_of.get(order.id)
+        if current is not None:
+            # Only the customer and items are indexed, so an order seen again
+            # with the same words, e.g. replayed, keeps its place.
+            if current == tuple(weights.items()):
+                return
+            self._remove(order.id)
+        # A re-indexed order moves to the end of its postings, so it also
+        # takes a new sequence number to keep postings in sequence order.
+        self._seq += 1
+        self._seqs[order.id] = self._seq
+        for token, weight in weights.items():
+            if token not in self.customer_postings and token not in self.item_postings:
+                self.tokens.add(token)
+            postings = self.customer_postings if weight == CUSTOMER_WEIGHT else self.item_postings
+            posting = postings.get(token)
+            if posting is None:
+                posting = postings[token] = {}
+            posting[order.id] = None
+        self._tokens_of[order.id] = tuple(weights.items())
+
+    def _remove(self, order_id: str):
+        # Emptied postings are kept, so the sorted token list never shrinks.
+        for token, weight in self._tokens_of[order_id]:
+            postings = self.customer_postings if weight == CUSTOMER_WEIGHT else self.item_postings
+            postings[token].pop(order_id, None)
@@ -0,0 +1,177 @@
+import heapq
+import threading
+import zlib
+from contextlib import ExitStack
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from models.order import Order
+from db.write_db import WriteDB
+from db.read_db import ReadDB
+
+# crc32 rather than hash() so every process agrees on which shard owns an id.
+def shard_of(order_id: str, shards: int) -> int:
+    return zlib.crc32(order_id.encode("utf-8")) % shards
+
+def group_by_shard(orders: Iterable[Order], shards: int) -> Dict[int, List[Order]]:
+    groups: Dict[int, List[Order]] = {}
+    for order in orders:
+        groups.setdefault(shard_of(order.id, shards), []).append(order)
+    return groups
+
+class _Striped:
+    # Lock striping: each shard is a plain store guarded by its own lock, so
+    # writes to orders in different shards never wait on each other.
+    def __init__(self, shards: int, factory: Callable):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.shards = [factory() for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+
+    def _shard(self, order_id: str) -> int:
+        return shard_of(order_id, len(self.shards))
+
+    def _all_locks(self) -> ExitStack:
+        # Always taken in shard order, so two callers cannot deadlock.
+        stack = ExitStack()
+        for lock in self.locks:
+            stack.enter_context(lock)
+        return stack
+
+class ShardedWriteDB(_Striped, WriteDB):
+    def __init__(self, shards: int = 16, factory: Callable[[], WriteDB] = WriteDB):
+        _Striped.__init__(self, shards, factory)
+
+    def save(self, order: Order):
+        i = self._shard(order.id)
+        with self.locks[i]:
+            self.shards[i].save(order)
+
+    def save_many(self, orders: Iterable[Order]):
+        for i, group in group_by_shard(orders, len(self.shards)).items():
+            with self.locks[i]:
+                self.shards[i].save_many(group)
+
+    def set_status(self, order_id: str, status: str, version: int):
+        i = self._shard(order_id)
+        with self.locks[i]:
+            self.shards[i].set_status(order_id, status, version)
+
+    def get(self, order_id: str) -> Optional[Order]:
+        i = self._shard(order_id)
+        with self.locks[i]:
+            return self.shards[i].get(order_id)
+
+    def all(self) -> List[Order]:
+        with self._all_locks():
+            return [order for shard in self.shards for order in shard.all()]
+
+    def snapshot(self) -> Callable[[], List[dict]]:
+        with self._all_locks():
+            encoders = [shard.snapshot() for shard in self.shards]
+        return lambda: [data for encode in encoders for data in encode()]
+
+class ShardedReadDB(_Striped):
+    # Page and stream order is shard by shard, each shard in insertion order.
+    def __init__(self, shards: int = 16, factory: Callable[[], ReadDB] = ReadDB):
+        super().__init__(shards, factory)
+
+    @classmethod
+    def from_shards(cls, shards: List[ReadDB]) -> "ShardedReadDB":
+        return cls(len(shards), iter(shards).__next__)
+
+    def update(self, order: Order):
+        i = self._shard(order.id)
+        with self.locks[i]:
+            self.shards[i].update(order)
+
+    def update_many(self, orders: Iterable[Order]):
+        for i, group in group_by_shard(orders, len(self.shards)).items():
+            with self.locks[i]:
+                self.shards[i].update_many(group)
+
+    def set_status(self, order_id: str, status: str, version: int):
+        i = self._shard(order_id)
+        with self.locks[i]:
+            self.shards[i].set_status(order_id, status, version)
+
+    def get_all(self) -> List[Order]:
+        # Holding every lock makes the result a consistent snapshot.
+        with self._all_locks():
+            return [order for shard in self.shards for order in shard.get_all()]
+
+    def get_by_id(self, order_id: str) -> Optional[Order]:
+        i = self._shard(order_id)
+        with self.locks[i]:
+            return self.shards[i].get_by_id(order_id)
+
+    def get_json(self, order_id: str) -> Optional[Tuple[bytes, int]]:
+        i = self._shard(order_id)
+        with self.locks[i]:
+            return self.shards[i].get_json(order_id)
+
+    def get_page(self, after: Optional[str], limit: Optional[int]) -> List[Order]:
+        first, cursor = (0, None) if after is None else (self._shard(after), after)
+        page: List[Order] = []
+        for i in range(first, len(self.shards)):
+            if limit is not None and len(page) >= limit:
+                break
+            with self.locks[i]:
+                page.extend(self.shards[i].get_page(cursor, None if limit is None else limit - len(page)))
+            cursor = None
+        return page
+
+    def iter_from(self, after: Optional[str] = None, chunk: int = 1000) -> Iterator[Order]:
+        # Fail on a bad cursor now, not when the stream is first read.
+        first = 0 if after is None else self._check_cursor(after)
+        return self._iter(first, after, chunk)
+
+    def get_by_customer(self, customer: str) -> List[Order]:
+        return self._fan_out(lambda shard: shard.get_by_customer(customer))
+
+    def get_by_status(self, status: str) -> List[Order]:
+        return self._fan_out(lambda shard: shard.get_by_status(status))
+
+    def get_by_item(self, item: str) -> List[Order]:
+        return self._fan_out(lambda shard: shard.get_by_item(item))
+
+    def get_created_between(self, since: Optional[float], until: Optional[float],
+                            limit: Optional[int] = None) -> List[Order]:
+        # Each shard returns its own first `limit` in time order; merging them
+        # and cutting again gives the first `limit` overall.
+        parts = self._each(lambda shard: shard.get_created_between(since, until, limit))
+        return list(islice(heapq.merge(*parts, key=_created_at), limit))
+
+    def get_latest(self, n: int) -> List[Order]:
+        parts = self._each(lambda shard: shard.get_latest(n))
+        return list(islice(heapq.merge(*parts, key=_created_at, reverse=True), n))
+
+    def _check_cursor(self, after: str) -> int:
+        i = self._shard(after)
+        with self.locks[i]:
+            self.shards[i].get_page(after, 0)
+        return i
+
+    def _iter(self, first: int, after: Optional[str], chunk: int) -> Iterator[Order]:
+        cursor = after
+        for i in range(first, len(self.shards)):
+            while True:
+                with self.locks[i]:
+                    page = self.shards[i].get_page(cursor, chunk)
+                yield from page
+                if len(page) < chunk:
+                    break
+                cursor = page[-1].id
+            cursor = None
+
+    def _fan_out(self, lookup: Callable[[ReadDB], List[Order]]) -> List[Order]:
+        return [order for part in self._each(lookup) for order in part]
+
+    def _each(self, lookup: Callable[[ReadDB], List[Order]]) -> List[List[Order]]:
+        parts = []
+        for shard, lock in zip(self.shards, self.locks):
+            with lock:
+                parts.append(lookup(shard))
+        return parts
+
+def _created_at(order: Order) -> float:
+    return order.created_at
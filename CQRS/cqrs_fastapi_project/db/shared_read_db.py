@@ -0,0 +1,197 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from models.order import Order
+from db.indexes import OrderIndexes, TimeIndex
+
+# File layout: a header holding a magic string and the offset where committed
+# data ends, followed by length-prefixed order records (the order's JSON).
+# Records are only ever appended; a changed order gets a new record and the
+# old one is left behind. Writers from every process take an exclusive flock,
+# append, then publish the new end offset. Readers map the same file and
+# index any records past the end they last saw, so a read in one worker sees
+# writes made by another without a round trip to it.
+MAGIC = b"CQRSRM01"
+_HEADER = struct.Struct("<8sQ")
+_LENGTH = struct.Struct("<I")
+DATA_START = 64
+
+Record = Tuple[int, int, int]  # offset, length, version
+
+class SharedReadDB:
+    def __init__(self, path: str, initial_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._write_mutex = threading.Lock()
+        with self._writing():
+            if os.fstat(self._fd).st_size < DATA_START:
+                os.ftruncate(self._fd, max(initial_bytes, DATA_START))
+                os.pwrite(self._fd, _HEADER.pack(MAGIC, DATA_START), 0)
+        self._map = mmap.mmap(self._fd, 0)
+        if _HEADER.unpack_from(self._map, 0)[0] != MAGIC:
+            raise ValueError(f"{path} is not a shared read model file")
+        self._lock = threading.Lock()
+        self._seen = DATA_START
+        self._records: Dict[str, Record] = {}
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self.indexes = OrderIndexes()
+        self.created: TimeIndex[str] = TimeIndex()
+        self._refresh()
+
+    def update(self, order: Order):
+        self.update_many((order,))
+
+    def update_many(self, orders: Iterable[Order]):
+        encoded = [(order.id, order.version, order.model_dump_json().encode("utf-8")) for order in orders]
+        with self._writing():
+            self._refresh()
+            # Orders already stored at the same or a newer version are skipped,
+            # so every worker can seed the file at startup without duplicating it.
+            self._append([body for order_id, version, body in encoded if self._version(order_id) < version])
+        self._refresh()
+
+    def set_status(self, order_id: str, status: str, version: int):
+        with self._writing():
+            self._refresh()
+            record = self._records.get(order_id)
+            if record is None or version <= record[2]:
+                return
+            data = json.loads(self._read(record))
+            data["status"], data["version"] = status, version
+            self._append([json.dumps(data, separators=(",", ":")).encode("utf-8")])
+        self._refresh()
+
+    def get_all(self) -> List[Order]:
+        self._refresh()
+        return self._orders(list(self._keys))
+
+    def get_by_id(self, order_id: str) -> Optional[Order]:
+        self._refresh()
+        record = self._records.get(order_id)
+        return None if record is None else Order.model_validate_json(self._read(record))
+
+    def get_json(self, order_id: str) -> Optional[Tuple[bytes, int]]:
+        self._refresh()
+        record = self._records.get(order_id)
+        return None if record is None else (self._read(record), record[2])
+
+    def get_page(self, after: Optional[str], limit: Optional[int]) -> List[Order]:
+        self._refresh()
+        start = self._start(after)
+        end = len(self._keys) if limit is None else start + limit
+        return self._orders(self._keys[start:end])
+
+    def iter_from(self, after: Optional[str] = None) -> Iterator[Order]:
+        self._refresh()
+        start, end = self._start(after), len(self._keys)
+        return (self.get_by_id(self._keys[i]) for i in range(start, end))
+
+    def get_by_customer(self, customer: str) -> List[Order]:
+        self._refresh()
+        return self._orders(self.indexes.customer(customer))
+
+    def get_by_status(self, status: str) -> List[Order]:
+        self._refresh()
+        return self._orders(self.indexes.status(status))
+
+    def get_by_item(self, item: str) -> List[Order]:
+        self._refresh()
+        return self._orders(self.indexes.item(item))
+
+    def get_created_between(self, since: Optional[float], until: Optional[float],
+                            limit: Optional[int] = None) -> List[Order]:
+        self._refresh()
+        return self._orders(self.created.between(since, until, limit))
+
+    def get_latest(self, n: int) -> List[Order]:
+        self._refresh()
+        return self._orders(self.created.latest(n))
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+    @contextmanager
+    def _writing(self):
+        # flock serializes writers across processes; the mutex covers threads
+        # of this process, which share one open file and so one flock.
+        with self._write_mutex:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _committed_end(self) -> int:
+        return _HEADER.unpack_from(self._map, 0)[1]
+
+    def _append(self, bodies: List[bytes]):
+        if not bodies:
+            return
+        end = self._committed_end()
+        needed = end + sum(_LENGTH.size + len(body) for body in bodies)
+        if needed > len(self._map):
+            os.ftruncate(self._fd, max(needed, 2 * len(self._map)))
+            self._map = mmap.mmap(self._fd, 0)
+        position = end
+        for body in bodies:
+            _LENGTH.pack_into(self._map, position, len(body))
+            self._map[position + _LENGTH.size:position + _LENGTH.size + len(body)] = body
+            position += _LENGTH.size + len(body)
+        # Publishing the end offset last makes the whole batch visible at once.
+        _HEADER.pack_into(self._map, 0, MAGIC, position)
+
+    def _refresh(self):
+        if self._committed_end() == self._seen:
+            return
+        with self._lock:
+            end = self._committed_end()
+            if end > len(self._map):
+                # Another process grew the file; map it again at its new size.
+                self._map = mmap.mmap(self._fd, 0)
+            position = self._seen
+            while position < end:
+                (length,) = _LENGTH.unpack_from(self._map, position)
+                self._index(position + _LENGTH.size, length)
+                position += _LENGTH.size + length
+            self._seen = end
+
+    def _index(self, offset: int, length: int):
+        data = json.loads(self._map[offset:offset + length])
+        order = Order.model_construct(**data)
+        old = self._records.get(order.id)
+        if old is None:
+            self._positions[order.id] = len(self._keys)
+            self._keys.append(order.id)
+            if order.created_at is not None:
+                self.created.add(order.created_at, order.id)
+        else:
+            self.indexes.remove(Order.model_construct(**json.loads(self._read(old))))
+        self._records[order.id] = (offset, length, order.version)
+        self.indexes.add(order)
+
+    def _version(self, order_id: str) -> int:
+        record = self._records.get(order_id)
+        return 0 if record is None else record[2]
+
+    def _read(self, record: Record) -> bytes:
+        offset, length, _ = record
+        return self._map[offset:offset + length]
+
+    def _start(self, after: Optional[str]) -> int:
+        if after is None:
+            return 0
+        position = self._positions.get(after)
+        if position is None:
+            raise ValueError(f"Unknown cursor: {after}")
+        return position + 1
+
+    def _orders(self, order_ids: List[str]) -> List[Order]:
+        records = self._records
+        return [Order.model_validate_json(self._read(records[order_id])) for order_id in order_ids]
@@ -0,0 +1,188 @@
+import math
+import sqlite3
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
+from models.order import Order
+
+# Orders are stored as their encoded JSON next to the columns the queries
+# filter on. seq is the rowid and gives the stable insertion order used for
+# pages. Each secondary index covers a query's filter and its ORDER BY, so no
+# query needs a sort step.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    customer TEXT NOT NULL,
+    status TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS orders_customer ON orders (customer, seq);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status, seq);
+CREATE TABLE IF NOT EXISTS order_items (
+    item TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (item, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS order_items_seq ON order_items (seq);
+"""
+# Files created before orders had a creation time get the column added.
+ADD_CREATED_AT = "ALTER TABLE orders ADD COLUMN created_at REAL"
+CREATED_INDEX = "CREATE INDEX IF NOT EXISTS orders_created ON orders (created_at, seq) WHERE created_at IS NOT NULL"
+
+UPSERT = """
+INSERT INTO orders (id, customer, status, version, body, created_at) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    customer = excluded.customer,
+    status = excluded.status,
+    version = excluded.version,
+    body = excluded.body
+"""
+# json_set patches the stored document in place. The body is kept as a BLOB
+# so get_json can return it as is, hence the casts.
+SET_STATUS = """
+UPDATE orders SET
+    status = ?1,
+    version = ?2,
+    body = CAST(json_set(CAST(body AS TEXT), '$.status', ?1, '$.version', ?2) AS BLOB)
+WHERE id = ?3 AND version < ?2
+"""
+DELETE_ITEMS = "DELETE FROM order_items WHERE seq = (SELECT seq FROM orders WHERE id = ?)"
+INSERT_ITEM = "INSERT OR IGNORE INTO order_items (item, seq) SELECT ?, seq FROM orders WHERE id = ?"
+SELECT_BY_ID = "SELECT body, version FROM orders WHERE id = ?"
+SELECT_SEQ = "SELECT seq FROM orders WHERE id = ?"
+SELECT_ALL = "SELECT body FROM orders ORDER BY seq"
+SELECT_PAGE = "SELECT body FROM orders WHERE seq > ? AND seq <= ? ORDER BY seq LIMIT ?"
+SELECT_CHUNK = "SELECT seq, body FROM orders WHERE seq > ? AND seq <= ? ORDER BY seq LIMIT ?"
+SELECT_MAX_SEQ = "SELECT COALESCE(MAX(seq), 0) FROM orders"
+SELECT_BY_CUSTOMER = "SELECT body FROM orders WHERE customer = ? ORDER BY seq"
+SELECT_BY_STATUS = "SELECT body FROM orders WHERE status = ? ORDER BY seq"
+SELECT_CREATED_BETWEEN = """
+SELECT body FROM orders WHERE created_at >= ? AND created_at < ?
+ORDER BY created_at, seq LIMIT ?
+"""
+SELECT_LATEST = """
+SELECT body FROM orders WHERE created_at IS NOT NULL
+ORDER BY created_at DESC, seq DESC LIMIT ?
+"""
+SELECT_BY_ITEM = """
+SELECT orders.body FROM order_items JOIN orders ON orders.seq = order_items.seq
+WHERE order_items.item = ? ORDER BY order_items.seq
+"""
+
+class SQLiteReadDB:
+    def __init__(self, path: str, chunk: int = 1000):
+        self.path = path
+        self.chunk = chunk
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if "created_at" not in {row[1] for row in conn.execute("PRAGMA table_info(orders)")}:
+            conn.execute(ADD_CREATED_AT)
+        conn.execute(CREATED_INDEX)
+
+    def update(self, order: Order):
+        self.update_many((order,))
+
+    def update_many(self, orders: Iterable[Order]):
+        orders = list(orders)
+        if not orders:
+            return
+        conn = self._conn()
+        with conn:
+            conn.executemany(UPSERT, [
+                (o.id, o.customer, o.status, o.version, o.model_dump_json().encode("utf-8"), o.created_at)
+                for o in orders
+            ])
+            conn.executemany(DELETE_ITEMS, [(o.id,) for o in orders])
+            conn.executemany(INSERT_ITEM, [(item, o.id) for o in orders for item in o.items])
+
+    def set_status(self, order_id: str, status: str, version: int):
+        conn = self._conn()
+        with conn:
+            conn.execute(SET_STATUS, (status, version, order_id))
+
+    def get_all(self) -> List[Order]:
+        return self._orders(self._conn().execute(SELECT_ALL))
+
+    def get_by_id(self, order_id: str) -> Optional[Order]:
+        row = self._conn().execute(SELECT_BY_ID, (order_id,)).fetchone()
+        return None if row is None else Order.model_validate_json(row[0])
+
+    def get_json(self, order_id: str) -> Optional[Tuple[bytes, int]]:
+        row = self._conn().execute(SELECT_BY_ID, (order_id,)).fetchone()
+        return None if row is None else (bytes(row[0]), row[1])
+
+    def get_page(self, after: Optional[str], limit: Optional[int]) -> List[Order]:
+        conn = self._conn()
+        start = self._start(conn, after)
+        rows = conn.execute(SELECT_PAGE, (start, 2 ** 62, -1 if limit is None else limit))
+        return self._orders(rows)
+
+    def iter_from(self, after: Optional[str] = None) -> Iterator[Order]:
+        conn = self._conn()
+        start = self._start(conn, after)
+        end = conn.execute(SELECT_MAX_SEQ).fetchone()[0]
+        return self._iter(start, end)
+
+    def get_by_customer(self, customer: str) -> List[Order]:
+        return self._orders(self._conn().execute(SELECT_BY_CUSTOMER, (customer,)))
+
+    def get_by_status(self, status: str) -> List[Order]:
+        return self._orders(self._conn().execute(SELECT_BY_STATUS, (status,)))
+
+    def get_by_item(self, item: str) -> List[Order]:
+        return self._orders(self._conn().execute(SELECT_BY_ITEM, (item,)))
+
+    def get_created_between(self, since: Optional[float], until: Optional[float],
+                            limit: Optional[int] = None) -> List[Order]:
+        bounds = (-math.inf if since is None else since, math.inf if until is None else until)
+        return self._orders(self._conn().execute(SELECT_CREATED_BETWEEN, (*bounds, -1 if limit is None else limit)))
+
+    def get_latest(self, n: int) -> List[Order]:
+        return self._orders(self._conn().execute(SELECT_LATEST, (n,)))
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, kept for the thread's lifetime so its
+        # statement cache keeps the prepared statements above.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _start(self, conn: sqlite3.Connection, after: Optional[str]) -> int:
+        if after is None:
+            return 0
+        row = conn.execute(SELECT_SEQ, (after,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown cursor: {after}")
+        return row[0]
+
+    def _iter(self, start: int, end: int) -> Iterator[Order]:
+        while start < end:
+            rows = self._conn().execute(SELECT_CHUNK, (start, end, self.chunk)).fetchall()
+            if not rows:
+                return
+            start = rows[-1][0]
+            for _, body in rows:
+                yield Order.model_validate_json(body)
+
+    @staticmethod
+    def _orders(rows) -> List[Order]:
+        return [Order.model_validate_json(row[0]) for row in rows]
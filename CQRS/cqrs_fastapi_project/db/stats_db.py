@@ -0,0 +1,109 @@
+import threading
+from typing import Dict, Iterable, List, Tuple, get_args
+from models.order import Order, OrderStatus
+
+class TopK:
+    # Min-heap of the k keys with the highest counts, plus each key's position
+    # in the heap. Counts only ever grow, so a key outside the heap can only
+    # get in by beating the current minimum. Each update is O(log k).
+    def __init__(self, k: int, counts: Dict[str, int]):
+        self.k = k
+        self._counts = counts
+        self._heap: List[str] = []
+        self._positions: Dict[str, int] = {}
+
+    def offer(self, key: str):
+        position = self._positions.get(key)
+        if position is not None:
+            self._sift_down(position)
+        elif len(self._heap) < self.k:
+            self._heap.append(key)
+            self._positions[key] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+        elif self._counts[key] > self._counts[self._heap[0]]:
+            del self._positions[self._heap[0]]
+            self._heap[0] = key
+            self._positions[key] = 0
+            self._sift_down(0)
+
+    def top(self) -> List[Tuple[str, int]]:
+        return sorted(((key, self._counts[key]) for key in self._heap), key=lambda kv: (-kv[1], kv[0]))
+
+    def _less(self, i: int, j: int) -> bool:
+        return self._counts[self._heap[i]] < self._counts[self._heap[j]]
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._positions[heap[i]] = i
+        self._positions[heap[j]] = j
+
+    def _sift_up(self, i: int):
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._less(i, parent):
+                return
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i: int):
+        size = len(self._heap)
+        while True:
+            smallest, left, right = i, 2 * i + 1, 2 * i + 2
+            if left < size and self._less(left, smallest):
+                smallest = left
+            if right < size and self._less(right, smallest):
+                smallest = right
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+class OrderStatsDB:
+    def __init__(self, top_k: int = 100):
+        self.customer_counts: Dict[str, int] = {}
+        self.status_counts: Dict[str, int] = {status: 0 for status in get_args(OrderStatus)}
+        self.item_counts: Dict[str, int] = {}
+        self.top_items = TopK(top_k, self.item_counts)
+        # Current status and version per order, so replayed or reordered
+        # events are not counted twice.
+        self._statuses: Dict[str, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, order: Order):
+        with self._lock:
+            self._add(order)
+
+    def add_many(self, orders: Iterable[Order]):
+        with self._lock:
+            for order in orders:
+                self._add(order)
+
+    def set_status(self, order_id: str, status: str, version: int):
+        with self._lock:
+            current = self._statuses.get(order_id)
+            if current is None or version <= current[1]:
+                return
+            self._statuses[order_id] = (status, version)
+            self.status_counts[current[0]] -= 1
+            self.status_counts[status] += 1
+
+    def customer_count(self, customer: str) -> int:
+        return self.customer_counts.get(customer, 0)
+
+    def statuses(self) -> Dict[str, int]:
+        return dict(self.status_counts)
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self.top_items.top()[:k]
+
+    def _add(self, order: Order):
+        if order.id in self._statuses:
+            return
+        self._statuses[order.id] = (order.status, order.version)
+        self.customer_counts[order.customer] = self.customer_counts.get(order.customer, 0) + 1
+        self.status_counts[order.status] += 1
+        for item in order.items:
+            self.item_counts[item] = self.item_counts.get(item, 0) + 1
+            self.top_items.offer(item)
@@ -0,0 +1,118 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Iterable, Iterator, List, Optional, Tuple
+from models.order import Order
+from db.sqlite_read_db import SQLiteReadDB
+
+# Rough per-entry cost of the OrderedDict node and tuple on top of the key and body.
+ENTRY_OVERHEAD = 120
+
+class TieredReadDB:
+    # A bounded LRU of encoded orders in front of an on-disk read model.
+    # Entries are filled by reads and dropped by writes, so the cache holds
+    # whatever is being read now and never serves a version older than the
+    # store's. Queries that return many orders go straight to the store.
+    def __init__(self, cold: SQLiteReadDB, max_bytes: int = 64 * 1024 * 1024):
+        self.cold = cold
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cache: "OrderedDict[str, Tuple[bytes, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every write, so a read that raced one does not cache what it read.
+        self._generation = 0
+
+    def update(self, order: Order):
+        self.cold.update(order)
+        self._invalidate((order.id,))
+
+    def update_many(self, orders: Iterable[Order]):
+        orders = list(orders)
+        self.cold.update_many(orders)
+        self._invalidate(order.id for order in orders)
+
+    def set_status(self, order_id: str, status: str, version: int):
+        self.cold.set_status(order_id, status, version)
+        self._invalidate((order_id,))
+
+    def get_by_id(self, order_id: str) -> Optional[Order]:
+        found = self.get_json(order_id)
+        return None if found is None else Order.model_validate_json(found[0])
+
+    def get_json(self, order_id: str) -> Optional[Tuple[bytes, int]]:
+        with self._lock:
+            found = self._cache.get(order_id)
+            if found is not None:
+                self._cache.move_to_end(order_id)
+                self.hits += 1
+                return found
+            self.misses += 1
+            generation = self._generation
+        found = self.cold.get_json(order_id)
+        if found is not None:
+            with self._lock:
+                if generation == self._generation and order_id not in self._cache:
+                    self._cache[order_id] = found
+                    self.bytes += self._size(order_id, found[0])
+                    self._evict()
+        return found
+
+    def get_all(self) -> List[Order]:
+        return self.cold.get_all()
+
+    def get_page(self, after: Optional[str], limit: Optional[int]) -> List[Order]:
+        return self.cold.get_page(after, limit)
+
+    def iter_from(self, after: Optional[str] = None) -> Iterator[Order]:
+        return self.cold.iter_from(after)
+
+    def get_by_customer(self, customer: str) -> List[Order]:
+        return self.cold.get_by_customer(customer)
+
+    def get_by_status(self, status: str) -> List[Order]:
+        return self.cold.get_by_status(status)
+
+    def get_by_item(self, item: str) -> List[Order]:
+        return self.cold.get_by_item(item)
+
+    def get_created_between(self, since: Optional[float], until: Optional[float],
+                            limit: Optional[int] = None) -> List[Order]:
+        return self.cold.get_created_between(since, until, limit)
+
+    def get_latest(self, n: int) -> List[Order]:
+        return self.cold.get_latest(n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._cache),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def close(self):
+        self.cold.close()
+
+    def _invalidate(self, order_ids: Iterable[str]):
+        with self._lock:
+            self._generation += 1
+            for order_id in order_ids:
+                found = self._cache.pop(order_id, None)
+                if found is not None:
+                    self.bytes -= self._size(order_id, found[0])
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self._cache:
+            order_id, (body, _) = self._cache.popitem(last=False)
+            self.bytes -= self._size(order_id, body)
+            self.evictions += 1
+
+    @staticmethod
+    def _size(order_id: str, body: bytes) -> int:
+        return sys.getsizeof(order_id) + sys.getsizeof(body) + ENTRY_OVERHEAD
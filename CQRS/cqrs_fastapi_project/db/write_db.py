@@ -1,5 +1,7 @@
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterable, List, Optional
 from models.order import Order
+from events.events import DomainEvent, ORDER_CREATED, ORDERS_CREATED, ORDER_STATUS_CHANGED
+from events.store import EventStore
 
 class WriteDB:
     def __init__(self):
@@ -8,5 +10,38 @@ class WriteDB:
     def save(self, order: Order):
         self.orders[order.id] = order
 
+    def save_many(self, orders: Iterable[Order]):
+        self.orders.update((order.id, order) for order in orders)
+
+    def set_status(self, order_id: str, status: str, version: int):
+        order = self.orders.get(order_id)
+        if order is not None and version > order.version:
+            self.orders[order_id] = order.model_copy(update={"status": status, "version": version})
+
     def get(self, order_id: str) -> Optional[Order]:
         return self.orders.get(order_id)
+
+    def all(self) -> List[Order]:
+        return list(self.orders.values())
+
+    def apply(self, event: DomainEvent):
+        if event.type == ORDER_CREATED:
+            self.save(Order(**event.payload))
+        elif event.type == ORDERS_CREATED:
+            self.save_many(Order(**data) for data in event.payload["orders"])
+        elif event.type == ORDER_STATUS_CHANGED:
+            self.set_status(event.payload["id"], event.payload["status"], event.payload["version"])
+
+    def snapshot(self) -> Callable[[], List[dict]]:
+        # Takes the state now and returns the function that encodes it, so
+        # the slow part can run off the request path. Orders are immutable,
+        # so a copy of the list of them is enough.
+        orders = self.all()
+        return lambda: [order.model_dump() for order in orders]
+
+    def restore(self, store: EventStore):
+        seq, orders = store.load_snapshot()
+        for data in orders:
+            self.save(Order(**data))
+        for _, event in store.replay(after=seq):
+            self.apply(event)
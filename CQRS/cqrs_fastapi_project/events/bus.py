@@ -1,16 +1,296 @@
-from typing import Callable, Dict, List
-from events.events import DomainEvent
+import asyncio
+import inspect
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
+from events.events import DomainEvent, order_ids
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP = "drop"
+OVERFLOW_REJECT = "reject"
+
+class BusFullError(Exception):
+    pass
+
+class _Queued:
+    __slots__ = ("event", "keys", "blocked", "taken", "dependents")
+
+    def __init__(self, event: DomainEvent, keys: List[str]):
+        self.event = event
+        self.keys = keys
+        # Earlier events sharing a key that haven't been handled yet.
+        self.blocked = 0
+        self.taken = False
+        self.dependents: Optional[List["_Queued"]] = None
+
+class _KeyOrder:
+    # Orders queued events that share a key. An event taken from the queue
+    # while an earlier one with its key is unhandled is parked, and the
+    # worker that handles the earlier one runs it next. Workers never wait on
+    # each other, so events may be queued in any order. Not thread-safe;
+    # EventBus calls it under a lock.
+    def __init__(self, key: Callable[[DomainEvent], List[str]]):
+        self.key = key
+        # Last queued, unhandled event per key.
+        self._tails: Dict[str, _Queued] = {}
+
+    def add(self, event: DomainEvent) -> _Queued:
+        item = _Queued(event, self.key(event))
+        for key in item.keys:
+            earlier = self._tails.get(key)
+            # A batch can list an id twice; item never waits for itself.
+            if earlier is not None and earlier is not item:
+                if earlier.dependents is None:
+                    earlier.dependents = []
+                earlier.dependents.append(item)
+                item.blocked += 1
+            self._tails[key] = item
+        return item
+
+    def take(self, item: _Queued) -> bool:
+        # Whether the worker that took item should handle it now.
+        item.taken = True
+        return not item.blocked
+
+    def done(self, item: _Queued) -> List[_Queued]:
+        # Marks item handled and returns the parked events it unblocked.
+        for key in item.keys:
+            if self._tails.get(key) is item:
+                del self._tails[key]
+        if item.dependents is None:
+            return []
+        ready = []
+        for dependent in item.dependents:
+            dependent.blocked -= 1
+            if not dependent.blocked and dependent.taken:
+                ready.append(dependent)
+        return ready
 
 class EventBus:
-    def __init__(self):
+    # With workers, events are handled concurrently, except that an event is
+    # handled only after every earlier event sharing one of its keys (by
+    # default its order ids, see order_ids). A status change therefore never
+    # reaches a projection before the order it changes.
+    def __init__(self, workers: int = 0, queue_size: int = 10000, overflow: str = OVERFLOW_BLOCK,
+                 put_timeout: Optional[float] = None,
+                 wrap_handler: Optional[Callable[[str, Callable], Callable]] = None,
+                 key: Callable[[DomainEvent], List[str]] = order_ids):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_REJECT):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        # Handler lists are replaced, never mutated, so publish can read them without a lock.
         self._handlers: Dict[str, List[Callable[[DomainEvent], None]]] = {}
+        self._subscribe_lock = threading.Lock()
+        self.overflow = overflow
+        self.put_timeout = put_timeout
+        self.wrap_handler = wrap_handler
+        self.dropped = 0
+        self._order = _KeyOrder(key)
+        # Guards _order, and keeps the full check and put of the drop policy together.
+        self._order_lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._workers: List[threading.Thread] = []
+        if workers > 0:
+            self._queue = queue.Queue(maxsize=queue_size)
+            for i in range(workers):
+                worker = threading.Thread(target=self._run, name=f"event-bus-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def subscribe(self, event_type: str, handler: Callable[[DomainEvent], None], blocking: bool = False):
+        # blocking is accepted for parity with AsyncEventBus; handlers here
+        # never run on an event loop, so a blocking one needs no special care.
+        if self.wrap_handler is not None:
+            handler = self.wrap_handler(event_type, handler)
+        with self._subscribe_lock:
+            self._handlers[event_type] = self._handlers.get(event_type, []) + [handler]
 
-    def subscribe(self, event_type: str, handler: Callable[[DomainEvent], None]):
-        if event_type not in self._handlers:
-            self._handlers[event_type] = []
-        self._handlers[event_type].append(handler)
+    def ensure_capacity(self):
+        # Admission check, called before a command runs so a rejected request
+        # has not written anything yet. Once an event is committed, publish
+        # waits for room rather than losing it.
+        if self._queue is None or self.overflow == OVERFLOW_DROP:
+            return
+        if self.overflow == OVERFLOW_REJECT:
+            if self._queue.full():
+                raise BusFullError("Event queue is full")
+            return
+        if self.put_timeout is None:
+            return
+        with self._queue.not_full:
+            if not self._queue.not_full.wait_for(
+                lambda: len(self._queue.queue) < self._queue.maxsize, self.put_timeout
+            ):
+                raise BusFullError("Event queue is full")
 
     def publish(self, event: DomainEvent):
+        # A dropped event is never ordered, so nothing waits for it.
+        if self._queue is None:
+            self._dispatch(event)
+        elif self.overflow == OVERFLOW_DROP:
+            with self._order_lock:
+                if self._queue.full():
+                    self.dropped += 1
+                else:
+                    self._queue.put_nowait(self._order.add(event))
+        else:
+            with self._order_lock:
+                item = self._order.add(event)
+            self._queue.put(item)
+
+    def drain(self):
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._queue is None:
+            return
+        self.drain()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _dispatch(self, event: DomainEvent):
         handlers = self._handlers.get(event.type, [])
         for handler in handlers:
             handler(event)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            # A parked event is marked done by the worker that runs it.
+            with self._order_lock:
+                pending = [item] if self._order.take(item) else []
+            while pending:
+                item = pending.pop()
+                try:
+                    self._dispatch(item.event)
+                except Exception as e:
+                    print(f"[ERROR] Event handler failed for {item.event.type}: {e}")
+                finally:
+                    with self._order_lock:
+                        pending.extend(self._order.done(item))
+                    self._queue.task_done()
+
+class AsyncEventBus:
+    # The EventBus contract on an event loop. Subscribers may be coroutine
+    # functions; plain functions run inline on the loop, so ones that block
+    # on disk or locks must subscribe with blocking=True to run in a thread.
+    # Worker tasks are started on first use, from inside the running loop.
+    # Events sharing a key are handled in publish order, as in EventBus.
+    def __init__(self, workers: int = 0, queue_size: int = 10000, overflow: str = OVERFLOW_BLOCK,
+                 put_timeout: Optional[float] = None,
+                 wrap_handler: Optional[Callable[[str, Callable], Callable]] = None,
+                 key: Callable[[DomainEvent], List[str]] = order_ids):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_REJECT):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self._handlers: Dict[str, List[Callable]] = {}
+        self.overflow = overflow
+        self.put_timeout = put_timeout
+        self.wrap_handler = wrap_handler
+        self.dropped = 0
+        self.workers = workers
+        self._order = _KeyOrder(key)
+        self._queue: Optional[asyncio.Queue] = asyncio.Queue(maxsize=queue_size) if workers > 0 else None
+        self._tasks: List[asyncio.Task] = []
+        self._room_waiters: List[asyncio.Future] = []
+
+    def subscribe(self, event_type: str, handler: Callable, blocking: bool = False):
+        if blocking:
+            handler = _in_thread(handler)
+        if self.wrap_handler is not None:
+            handler = self.wrap_handler(event_type, handler)
+        self._handlers[event_type] = self._handlers.get(event_type, []) + [handler]
+
+    async def ensure_capacity(self):
+        if self._queue is None or self.overflow == OVERFLOW_DROP:
+            return
+        self._start()
+        if self.overflow == OVERFLOW_REJECT:
+            if self._queue.full():
+                raise BusFullError("Event queue is full")
+            return
+        if self.put_timeout is None or not self._queue.full():
+            return
+        try:
+            await asyncio.wait_for(self._wait_for_room(), self.put_timeout)
+        except asyncio.TimeoutError:
+            raise BusFullError("Event queue is full")
+
+    async def publish(self, event: DomainEvent):
+        if self._queue is None:
+            await self._dispatch(event)
+            return
+        self._start()
+        if self.overflow == OVERFLOW_DROP:
+            if self._queue.full():
+                self.dropped += 1
+            else:
+                self._queue.put_nowait(self._order.add(event))
+        else:
+            # Waits for room before ordering the event, so a publish cancelled
+            # while waiting leaves nothing that later events would wait for.
+            if self._queue.full():
+                await self._wait_for_room()
+            self._queue.put_nowait(self._order.add(event))
+
+    async def drain(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        if self._queue is None or not self._tasks:
+            return
+        await self.drain()
+        for _ in self._tasks:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
+
+    def _start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def _wait_for_room(self):
+        while self._queue.full():
+            waiter = asyncio.get_running_loop().create_future()
+            self._room_waiters.append(waiter)
+            await waiter
+
+    async def _dispatch(self, event: DomainEvent):
+        for handler in self._handlers.get(event.type, []):
+            result = handler(event)
+            if inspect.isawaitable(result):
+                await result
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if self._room_waiters:
+                waiters, self._room_waiters = self._room_waiters, []
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+            if item is None:
+                self._queue.task_done()
+                return
+            pending = [item] if self._order.take(item) else []
+            while pending:
+                item = pending.pop()
+                try:
+                    await self._dispatch(item.event)
+                except Exception as e:
+                    print(f"[ERROR] Event handler failed for {item.event.type}: {e}")
+                finally:
+                    pending.extend(self._order.done(item))
+                    self._queue.task_done()
+
+def _in_thread(handler: Callable) -> Callable:
+    async def run(event: DomainEvent):
+        await asyncio.to_thread(handler, event)
+    run.__qualname__ = getattr(handler, "__qualname__", repr(handler))
+    return run
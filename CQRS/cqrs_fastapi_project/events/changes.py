@@ -0,0 +1,119 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, List, Optional, Tuple, Union
+from pydantic import BaseModel
+from events.bus import EventBus
+from events.events import DomainEvent, TrustedEvent, ORDER_CREATED, ORDERS_CREATED, ORDER_STATUS_CHANGED
+
+Change = Tuple[int, str]
+
+class _Pending:
+    # A change as it came off the bus, encoded the first time a client reads
+    # it. The feed is always subscribed, so with no SSE clients nothing is
+    # ever serialized, and a TrustedEvent's order is never dumped to a dict.
+    __slots__ = ("_value", "_data")
+
+    def __init__(self, value: Any):
+        self._value = value
+        self._data: Optional[str] = None
+
+    @property
+    def data(self) -> str:
+        if self._data is None:
+            value = self._value
+            if isinstance(value, BaseModel):
+                self._data = f'{{"type": "{ORDER_CREATED}", "order": {value.model_dump_json()}}}'
+            else:
+                self._data = json.dumps(value)
+            self._value = None
+        return self._data
+
+class ChangeFeed:
+    # Keeps the last `capacity` read-model changes, each numbered with a
+    # version that increases by one. The epoch changes on every start, so a
+    # client resuming with an id from an earlier process is told to resync
+    # instead of silently skipping changes.
+    def __init__(self, capacity: int = 10000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._changes: Deque[Tuple[int, _Pending]] = deque(maxlen=capacity)
+        self._version = 0
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def subscribe(self, bus: EventBus):
+        bus.subscribe(ORDER_CREATED, self.on_order_created)
+        bus.subscribe(ORDERS_CREATED, self.on_orders_created)
+        bus.subscribe(ORDER_STATUS_CHANGED, self.on_status_changed)
+
+    def on_order_created(self, event: Union[DomainEvent, TrustedEvent]):
+        if isinstance(event, TrustedEvent):
+            self.append([event.model])
+        else:
+            self.append([{"type": event.type, "order": event.payload}])
+
+    def on_orders_created(self, event: Union[DomainEvent, TrustedEvent]):
+        if isinstance(event, TrustedEvent):
+            self.append(event.model["orders"])
+        else:
+            self.append([{"type": ORDER_CREATED, "order": order} for order in event.payload["orders"]])
+
+    def on_status_changed(self, event: DomainEvent):
+        self.append([{"type": event.type, **event.payload}])
+
+    def append(self, changes: List[Any]):
+        # Each change is a dict to encode as is, or a created Order.
+        pending = [_Pending(change) for change in changes]
+        with self._lock:
+            for change in pending:
+                self._version += 1
+                self._changes.append((self._version, change))
+            waiters, self._waiters = self._waiters, []
+        for loop, ready in waiters:
+            loop.call_soon_threadsafe(ready.set)
+
+    def event_id(self, version: int) -> str:
+        return f"{self.epoch}-{version}"
+
+    def parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        # None means the id can't be resumed from and the client must resync.
+        epoch, _, version = (event_id or "").partition("-")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def since(self, version: int) -> Optional[List[Change]]:
+        with self._lock:
+            if version > self._version:
+                return None
+            if version == self._version:
+                return []
+            oldest = self._changes[0][0] if self._changes else self._version + 1
+            if version < oldest - 1:
+                return None
+            changes = list(islice(self._changes, version - oldest + 1, None))
+        return [(v, change.data) for v, change in changes]
+
+    async def wait(self, version: int, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        waiter = (loop, ready)
+        with self._lock:
+            if self._version > version:
+                return True
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            return False
@@ -1,7 +1,51 @@
+from typing import Any, List, Optional, Union
 from pydantic import BaseModel
 
 class DomainEvent(BaseModel):
     type: str
     payload: dict
 
+class TrustedEvent:
+    # In-process fast path: carries the already validated, immutable model so
+    # subscribers can use it as is. The dict payload is only built if someone
+    # asks for it, e.g. to write the event to disk or send it to another process.
+    __slots__ = ("type", "model", "_payload")
+
+    def __init__(self, type: str, model: Any):
+        self.type = type
+        self.model = model
+        self._payload: Optional[dict] = None
+
+    @property
+    def payload(self) -> dict:
+        if self._payload is None:
+            self._payload = _dump(self.model)
+        return self._payload
+
+    def to_domain_event(self) -> DomainEvent:
+        return DomainEvent(type=self.type, payload=self.payload)
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return {key: _dump(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    return value
+
 ORDER_CREATED = "ORDER_CREATED"
+ORDERS_CREATED = "ORDERS_CREATED"
+# Delta event: carries only id, new status and the new version.
+ORDER_STATUS_CHANGED = "ORDER_STATUS_CHANGED"
+
+def order_ids(event: Union[DomainEvent, TrustedEvent]) -> List[str]:
+    # The orders an event is about; reads the model of a TrustedEvent, so it
+    # never builds the payload.
+    if isinstance(event, TrustedEvent):
+        if event.type == ORDERS_CREATED:
+            return [order.id for order in event.model["orders"]]
+        return [event.model.id] if event.type == ORDER_CREATED else []
+    if event.type == ORDERS_CREATED:
+        return [order["id"] for order in event.payload["orders"]]
+    return [event.payload["id"]] if "id" in event.payload else []
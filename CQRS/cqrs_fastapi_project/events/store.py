@@ -0,0 +1,190 @@
+import json
+import os
+import struct
+import threading
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+from events.events import DomainEvent, TrustedEvent
+
+# Every record is a (sequence number, payload length) header followed by the
+# JSON encoded event. Segment files are named after the first sequence number
+# they contain, so replay can skip whole segments without opening them.
+_HEADER = struct.Struct(">QI")
+_SEGMENT_SUFFIX = ".log"
+_SNAPSHOT_PREFIX = "snapshot-"
+
+
+class EventStore:
+    def __init__(self, path: str, segment_bytes: int = 64 * 1024 * 1024,
+                 snapshot_every: int = 100_000, fsync: bool = False):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._segments: List[int] = sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(path) if name.endswith(_SEGMENT_SUFFIX)
+        )
+        if not self._segments:
+            self._segments.append(1)
+        self._last_seq = self._recover_last_segment()
+        snapshots = self._snapshots()
+        self._snapshot_seq = snapshots[-1] if snapshots else 0
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._snapshot_running = False
+        # Replays in progress; segments are not pruned while one is reading.
+        self._replays = 0
+        self._file = open(self._segment_path(self._segments[-1]), "ab")
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def append(self, event: Union[DomainEvent, TrustedEvent]) -> int:
+        data = json.dumps({"type": event.type, "payload": event.payload}).encode("utf-8")
+        with self._lock:
+            seq = self._last_seq + 1
+            if self._file.tell() and self._file.tell() + _HEADER.size + len(data) > self.segment_bytes:
+                self._roll(seq)
+            self._file.write(_HEADER.pack(seq, len(data)) + data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._last_seq = seq
+        return seq
+
+    def replay(self, after: int = 0) -> Iterator[Tuple[int, DomainEvent]]:
+        with self._lock:
+            self._replays += 1
+            segments = list(self._segments)
+        try:
+            for i, first_seq in enumerate(segments):
+                if i + 1 < len(segments) and segments[i + 1] <= after + 1:
+                    continue
+                for seq, data in self._read_segment(first_seq, after):
+                    yield seq, DomainEvent(**json.loads(data))
+        finally:
+            with self._lock:
+                self._replays -= 1
+
+    def claim_snapshot(self, seq: int) -> bool:
+        # Only one caller gets to write each snapshot, and not while the
+        # previous one is still being written.
+        with self._lock:
+            if self._snapshot_running or seq - self._snapshot_seq < self.snapshot_every:
+                return False
+            self._snapshot_seq = seq
+            self._snapshot_running = True
+            return True
+
+    def save_snapshot(self, seq: int, encode: Callable[[], List[dict]]):
+        # Called with a claim and the state captured by WriteDB.snapshot.
+        # Encoding, fsync and rename happen on a background thread, so the
+        # request that crossed snapshot_every doesn't wait for them.
+        self._snapshot_thread = threading.Thread(
+            target=self._write_snapshot, args=(seq, encode), name="event-store-snapshot", daemon=True,
+        )
+        self._snapshot_thread.start()
+
+    def load_snapshot(self) -> Tuple[int, List[dict]]:
+        snapshots = self._snapshots()
+        if not snapshots:
+            return 0, []
+        with open(os.path.join(self.path, f"{_SNAPSHOT_PREFIX}{snapshots[-1]:020d}.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        return data["seq"], data["orders"]
+
+    def close(self):
+        # Lets a snapshot being written finish first.
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        with self._lock:
+            self._file.close()
+
+    def _write_snapshot(self, seq: int, encode: Callable[[], List[dict]]):
+        # The state may already contain a few events newer than seq when
+        # writers run concurrently; replaying them again is harmless because
+        # applying an event is idempotent.
+        try:
+            target = os.path.join(self.path, f"{_SNAPSHOT_PREFIX}{seq:020d}.json")
+            tmp = target + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"seq": seq, "orders": encode()}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, target)
+            for old in self._snapshots()[:-1]:
+                os.remove(os.path.join(self.path, f"{_SNAPSHOT_PREFIX}{old:020d}.json"))
+            self._prune(seq)
+        finally:
+            with self._lock:
+                self._snapshot_running = False
+
+    def _prune(self, seq: int):
+        # Deletes segments holding only events up to seq, which a restore
+        # from the snapshot at seq never reads. Skipped while a replay is
+        # reading; the segment being written is never deleted.
+        with self._lock:
+            if self._replays:
+                return
+            keep = 0
+            while keep + 1 < len(self._segments) and self._segments[keep + 1] <= seq + 1:
+                keep += 1
+            dropped, self._segments = self._segments[:keep], self._segments[keep:]
+        for first_seq in dropped:
+            os.remove(self._segment_path(first_seq))
+
+    def _segment_path(self, first_seq: int) -> str:
+        return os.path.join(self.path, f"{first_seq:020d}{_SEGMENT_SUFFIX}")
+
+    def _snapshots(self) -> List[int]:
+        return sorted(
+            int(name[len(_SNAPSHOT_PREFIX):-len(".json")])
+            for name in os.listdir(self.path)
+            if name.startswith(_SNAPSHOT_PREFIX) and name.endswith(".json")
+        )
+
+    def _roll(self, first_seq: int):
+        self._file.close()
+        self._segments.append(first_seq)
+        self._file = open(self._segment_path(first_seq), "ab")
+
+    def _read_segment(self, first_seq: int, after: int) -> Iterator[Tuple[int, bytes]]:
+        with open(self._segment_path(first_seq), "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                seq, length = _HEADER.unpack(header)
+                if seq <= after:
+                    f.seek(length, os.SEEK_CUR)
+                    continue
+                data = f.read(length)
+                if len(data) < length:
+                    return
+                yield seq, data
+
+    def _recover_last_segment(self) -> int:
+        # Drop a partially written record left behind by a crash.
+        first_seq = self._segments[-1]
+        last_seq, good = first_seq - 1, 0
+        path = self._segment_path(first_seq)
+        if not os.path.exists(path):
+            return last_seq
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                seq, length = _HEADER.unpack(header)
+                if good + _HEADER.size + length > size:
+                    break
+                f.seek(length, os.SEEK_CUR)
+                last_seq, good = seq, good + _HEADER.size + length
+        if good < size:
+            with open(path, "r+b") as f:
+                f.truncate(good)
+        return last_seq
@@ -1,45 +1,390 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from pydantic import ValidationError
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from functools import partial
+from itertools import islice
+from typing import List, Literal, Optional
 from uuid import uuid4
+import asyncio
+import hmac
+import threading
+import time
 
+import config
+from metrics import Metrics, RequestTimingMiddleware
 from db.write_db import WriteDB
 from db.read_db import ReadDB
-from events.bus import EventBus
-from events.events import ORDER_CREATED, DomainEvent
-from command.handlers import OrderCommandHandler
-from command.commands import CreateOrderCommand
-from query.handlers import OrderQueryHandler
-from query.queries import GetOrderByIdQuery, GetAllOrdersQuery
+from db.compact import CompactWriteDB, CompactReadDB
+from db.sharded import ShardedWriteDB, ShardedReadDB
+from db.sqlite_read_db import SQLiteReadDB
+from db.shared_read_db import SharedReadDB
+from db.tiered_read_db import TieredReadDB
+from db.stats_db import OrderStatsDB
+from db.search_db import OrderSearchDB
+from events.bus import AsyncEventBus, BusFullError
+from events.store import EventStore
+from events.changes import ChangeFeed
+from command.handlers import AsyncOrderCommandHandler, OrderNotFound, InvalidTransition
+from command.idempotency import IdempotencyCache, IdempotencyKeyReused
+from command.commands import CreateOrderCommand, CreateOrdersBatchCommand, ConfirmOrderCommand, CancelOrderCommand
+from query.handlers import AsyncOrderQueryHandler, AsyncOrderSearchQueryHandler, OrderStatsQueryHandler
+from query.projections import ReadModelProjection, StatsProjection, SearchProjection
+from query.rebuild import rebuild_read_db
+from query.queries import (
+    GetOrderByIdQuery,
+    GetAllOrdersQuery,
+    GetOrdersByCustomerQuery,
+    GetOrdersByStatusQuery,
+    GetOrdersByItemQuery,
+    GetOrdersCreatedBetweenQuery,
+    GetLatestOrdersQuery,
+    GetCustomerOrderCountQuery,
+    GetStatusCountsQuery,
+    GetTopItemsQuery,
+    SearchOrdersQuery,
+)
+from models.order import OrderStatus
 
 app = FastAPI(title="CQRS Example")
 
-write_db = WriteDB()
-read_db = ReadDB()
-bus = EventBus()
+metrics = None
+if config.METRICS_ENABLED:
+    metrics = Metrics()
+    metrics.describe("cqrs_request_seconds", "Time to serve a request, by route.")
+    metrics.describe("cqrs_stage_seconds", "Time spent in each stage of the command path.")
+    metrics.describe("cqrs_bus_handler_seconds", "Time spent in each event bus subscriber.")
+    app.add_middleware(RequestTimingMiddleware, metrics=metrics)
 
-command_handler = OrderCommandHandler(write_db, bus)
-query_handler = OrderQueryHandler(read_db)
+def timed_handler(event_type, handler):
+    name = getattr(handler, "__qualname__", repr(handler))
+    return metrics.timed(handler, "cqrs_bus_handler_seconds", event=event_type, handler=name)
 
-def update_read_model(event: DomainEvent):
-    from models.order import Order
-    order = Order(**event.payload)
-    read_db.update(order)
+def build_write_db():
+    factory = CompactWriteDB if config.STORAGE == "compact" else WriteDB
+    return ShardedWriteDB(config.STORE_SHARDS, factory) if config.STORE_SHARDS else factory()
 
-bus.subscribe(ORDER_CREATED, update_read_model)
+def read_db_factory():
+    if config.STORAGE == "compact":
+        return CompactReadDB
+    return partial(ReadDB, cache_json=config.READ_DB_JSON_CACHE)
+
+def build_read_db():
+    if config.READ_DB_BACKEND == "shared" and config.EVENT_STORE_DIR:
+        # The shared model exists to serve several workers, and they can't
+        # share an event store: each would number and snapshot events on its
+        # own, and a restart would drop the other workers' orders.
+        raise ValueError("READ_DB_BACKEND=shared can't be combined with EVENT_STORE_DIR")
+    if config.READ_DB_BACKEND == "sqlite":
+        return SQLiteReadDB(config.READ_DB_PATH)
+    if config.READ_DB_BACKEND == "shared":
+        return SharedReadDB(config.READ_DB_SHARED_PATH)
+    if config.READ_DB_BACKEND == "tiered":
+        return TieredReadDB(SQLiteReadDB(config.READ_DB_PATH), config.READ_DB_CACHE_BYTES)
+    factory = read_db_factory()
+    return ShardedReadDB(config.STORE_SHARDS, factory) if config.STORE_SHARDS else factory()
+
+write_db = build_write_db()
+read_db = build_read_db()
+stats_db = OrderStatsDB(config.STATS_TOP_K) if config.STATS_ENABLED else None
+search_db = OrderSearchDB() if config.SEARCH_ENABLED else None
+bus = AsyncEventBus(
+    workers=config.BUS_WORKERS,
+    queue_size=config.BUS_QUEUE_SIZE,
+    overflow=config.BUS_OVERFLOW,
+    put_timeout=config.BUS_PUT_TIMEOUT,
+    wrap_handler=timed_handler if metrics else None,
+)
+event_store = None
+if config.EVENT_STORE_DIR:
+    event_store = EventStore(
+        config.EVENT_STORE_DIR,
+        segment_bytes=config.EVENT_STORE_SEGMENT_BYTES,
+        snapshot_every=config.SNAPSHOT_EVERY,
+        fsync=config.EVENT_STORE_FSYNC,
+    )
+    write_db.restore(event_store)
+    restored = write_db.all()
+    read_db.update_many(restored)
+    if config.STATS_ENABLED:
+        stats_db.add_many(restored)
+    if config.SEARCH_ENABLED:
+        search_db.add_many(restored)
+
+command_handler = AsyncOrderCommandHandler(write_db, bus, event_store, trusted_events=config.TRUSTED_EVENTS)
+validate_order = CreateOrderCommand
+validate_batch = CreateOrdersBatchCommand.model_validate
+if metrics:
+    validate_order = metrics.timed(validate_order, "cqrs_stage_seconds", stage="validate")
+    validate_batch = metrics.timed(validate_batch, "cqrs_stage_seconds", stage="validate")
+    for method in ("save", "save_many", "set_status"):
+        metrics.instrument(write_db, method, "cqrs_stage_seconds", stage=f"write_db.{method}")
+    if event_store:
+        metrics.instrument(event_store, "append", "cqrs_stage_seconds", stage="event_store.append")
+    metrics.instrument(bus, "publish", "cqrs_stage_seconds", stage="bus.publish")
+    for method in ("handle_create_order", "handle_create_orders", "handle_confirm_order", "handle_cancel_order"):
+        metrics.instrument(command_handler, method, "cqrs_stage_seconds", stage=f"command.{method}")
+    if isinstance(read_db, TieredReadDB):
+        metrics.describe("cqrs_read_cache_lookups_total", "Order lookups answered by the read model cache, by result.")
+        metrics.describe("cqrs_read_cache_evictions_total", "Orders evicted from the read model cache.")
+        metrics.describe("cqrs_read_cache_bytes", "Approximate memory held by the read model cache.")
+        metrics.callback("cqrs_read_cache_lookups_total", "counter", lambda: read_db.hits, result="hit")
+        metrics.callback("cqrs_read_cache_lookups_total", "counter", lambda: read_db.misses, result="miss")
+        metrics.callback("cqrs_read_cache_evictions_total", "counter", lambda: read_db.evictions)
+        metrics.callback("cqrs_read_cache_bytes", "gauge", lambda: read_db.bytes)
+
+idempotency = IdempotencyCache(config.IDEMPOTENCY_MAX_KEYS, config.IDEMPOTENCY_TTL)
+# SQLite, also behind the tiered cache, and the shared file block on disk and
+# file locks, so their reads and projection updates run in threads; the
+# in-memory stores are used inline.
+blocking_read_db = config.READ_DB_BACKEND != "memory"
+query_handler = AsyncOrderQueryHandler(read_db, offload=blocking_read_db)
+
+projection = ReadModelProjection(read_db)
+projection.subscribe(bus, blocking=blocking_read_db)
+if config.STATS_ENABLED:
+    stats_handler = OrderStatsQueryHandler(stats_db)
+    StatsProjection(stats_db).subscribe(bus)
+if config.SEARCH_ENABLED:
+    search_handler = AsyncOrderSearchQueryHandler(search_db, query_handler, offload=blocking_read_db)
+    SearchProjection(search_db).subscribe(bus)
+# Subscribed after the projection, so a change is announced once the read model has it.
+change_feed = ChangeFeed(config.CHANGE_FEED_SIZE)
+change_feed.subscribe(bus)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await bus.close()
+    if event_store:
+        # Waits for a snapshot being written, so it runs off the event loop.
+        await asyncio.to_thread(event_store.close)
+    if isinstance(read_db, (SQLiteReadDB, SharedReadDB, TieredReadDB)):
+        read_db.close()
+
+rebuild_lock = threading.Lock()
+
+def rebuild_read_model(source: str) -> dict:
+    # Partitions are the STORE_SHARDS shards, so the rebuilt store has the
+    # same layout, page order and cursors as the one it replaces. Only the
+    # compact store pickles cheaply enough to be worth building in worker
+    # processes; the dict store is rebuilt partition by partition here.
+    partitions = config.STORE_SHARDS or 1
+    workers = min(config.REBUILD_WORKERS, partitions) if config.STORAGE == "compact" and partitions > 1 else 0
+    start = time.perf_counter()
+    projection.start_buffering()
+    try:
+        if source == "events":
+            history = build_write_db()
+            history.restore(event_store)
+            orders = history.all()
+        else:
+            orders = write_db.all()
+        rebuilt = rebuild_read_db(orders, read_db_factory(), partitions, workers)
+    except BaseException:
+        projection.stop_buffering()
+        raise
+    projection.swap(rebuilt)
+    query_handler.db = rebuilt
+    return {
+        "orders": len(orders),
+        "partitions": partitions,
+        "workers": workers,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+async def run_idempotent(route: str, key: Optional[str], payload, handler):
+    # Retries with a known key are answered from memory, before any store or the bus is touched.
+    if key is None:
+        return await handler()
+    try:
+        return await idempotency.run_async(f"{route} {key}", payload, handler)
+    except IdempotencyKeyReused:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different payload")
 
 @app.post("/orders")
-def create_order(payload: dict):
+async def create_order(payload: dict, idempotency_key: Optional[str] = Header(None)):
+    return await run_idempotent("POST /orders", idempotency_key, payload, lambda: _create_order(payload))
+
+async def _create_order(payload: dict):
     order_id = str(uuid4())
-    command = CreateOrderCommand(id=order_id, **payload)
-    command_handler.handle_create_order(command)
+    command = validate_order(id=order_id, **payload)
+    try:
+        await bus.ensure_capacity()
+        await command_handler.handle_create_order(command)
+    except BusFullError:
+        raise HTTPException(status_code=503, detail="Event queue is full, retry later")
     return {"id": order_id}
 
+NDJSON = "application/x-ndjson"
+
+def encode_ndjson(orders):
+    orders = iter(orders)
+    while True:
+        chunk = list(islice(orders, config.NDJSON_CHUNK_SIZE))
+        if not chunk:
+            return
+        yield "".join(order.model_dump_json() + "\n" for order in chunk).encode("utf-8")
+
+@app.post("/orders/batch")
+async def create_orders(payload: List[dict], idempotency_key: Optional[str] = Header(None)):
+    return await run_idempotent("POST /orders/batch", idempotency_key, payload, lambda: _create_orders(payload))
+
+async def _create_orders(payload: List[dict]):
+    try:
+        command = validate_batch(
+            {"orders": [{**item, "id": str(uuid4())} for item in payload]}
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    try:
+        await bus.ensure_capacity()
+        order_ids = await command_handler.handle_create_orders(command)
+    except BusFullError:
+        raise HTTPException(status_code=503, detail="Event queue is full, retry later")
+    return {"ids": order_ids}
+
+async def change_status(handle, command):
+    try:
+        await bus.ensure_capacity()
+        return await handle(command)
+    except OrderNotFound:
+        raise HTTPException(status_code=404, detail="Order not found")
+    except InvalidTransition as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except BusFullError:
+        raise HTTPException(status_code=503, detail="Event queue is full, retry later")
+
+@app.post("/orders/{order_id}/confirm")
+async def confirm_order(order_id: str):
+    return await change_status(command_handler.handle_confirm_order, ConfirmOrderCommand(id=order_id))
+
+@app.post("/orders/{order_id}/cancel")
+async def cancel_order(order_id: str):
+    return await change_status(command_handler.handle_cancel_order, CancelOrderCommand(id=order_id))
+
 @app.get("/orders")
-def list_orders():
-    return query_handler.handle_get_all(GetAllOrdersQuery())
+async def list_orders(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=config.MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+):
+    query = GetAllOrdersQuery(limit=limit, after=after)
+    try:
+        if NDJSON in request.headers.get("accept", ""):
+            orders = await query_handler.handle_stream_all(query)
+            if limit is not None:
+                orders = islice(orders, limit)
+            return StreamingResponse(encode_ndjson(orders), media_type=NDJSON)
+        page = await query_handler.handle_get_all(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit is not None and len(page) == limit:
+        response.headers["X-Next-Cursor"] = page[-1].id
+    return page
+
+# Declared before /orders/{order_id}, which would otherwise match "search",
+# "created" and "latest".
+if config.SEARCH_ENABLED:
+    @app.get("/orders/search")
+    async def search_orders(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=config.MAX_PAGE_SIZE)):
+        return await search_handler.handle_search(SearchOrdersQuery(q=q, limit=limit))
+
+@app.get("/orders/created")
+async def list_orders_created(
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: Optional[int] = Query(None, ge=1, le=config.MAX_PAGE_SIZE),
+):
+    query = GetOrdersCreatedBetweenQuery(since=since, until=until, limit=limit)
+    return await query_handler.handle_get_created_between(query)
+
+@app.get("/orders/latest")
+async def list_latest_orders(n: int = Query(20, ge=1, le=config.MAX_PAGE_SIZE)):
+    return await query_handler.handle_get_latest(GetLatestOrdersQuery(n=n))
+
+@app.get("/orders/changes")
+async def order_changes(request: Request, last_event_id: Optional[str] = Header(None)):
+    async def stream():
+        version = change_feed.version
+        if last_event_id is not None:
+            resumed = change_feed.parse_event_id(last_event_id)
+            if resumed is None:
+                yield f"id: {change_feed.event_id(version)}\nevent: reset\ndata: {{}}\n\n"
+            else:
+                version = resumed
+        while not await request.is_disconnected():
+            changes = change_feed.since(version)
+            if changes is None:
+                # The client fell behind the buffer; it has to reload GET /orders.
+                version = change_feed.version
+                yield f"id: {change_feed.event_id(version)}\nevent: reset\ndata: {{}}\n\n"
+            elif changes:
+                version = changes[-1][0]
+                yield "".join(f"id: {change_feed.event_id(v)}\ndata: {data}\n\n" for v, data in changes)
+            elif not await change_feed.wait(version, config.CHANGE_FEED_KEEPALIVE):
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
 
 @app.get("/orders/{order_id}")
-def get_order(order_id: str):
-    order = query_handler.handle_get_by_id(GetOrderByIdQuery(id=order_id))
-    if not order:
+async def get_order(order_id: str, request: Request):
+    found = await query_handler.handle_get_json_by_id(GetOrderByIdQuery(id=order_id))
+    if not found:
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    body, version = found
+    etag = f'"{version}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@app.get("/customers/{customer}/orders")
+async def list_customer_orders(customer: str):
+    return await query_handler.handle_get_by_customer(GetOrdersByCustomerQuery(customer=customer))
+
+@app.get("/statuses/{status}/orders")
+async def list_status_orders(status: OrderStatus):
+    return await query_handler.handle_get_by_status(GetOrdersByStatusQuery(status=status))
+
+@app.get("/items/{item}/orders")
+async def list_item_orders(item: str):
+    return await query_handler.handle_get_by_item(GetOrdersByItemQuery(item=item))
+
+if config.STATS_ENABLED:
+    @app.get("/stats/customers/{customer}")
+    async def customer_stats(customer: str):
+        return stats_handler.handle_customer_count(GetCustomerOrderCountQuery(customer=customer))
+
+    @app.get("/stats/statuses")
+    async def status_stats():
+        return stats_handler.handle_status_counts(GetStatusCountsQuery())
+
+    @app.get("/stats/items/top")
+    async def top_items(k: int = Query(10, ge=1, le=config.STATS_TOP_K)):
+        return stats_handler.handle_top_items(GetTopItemsQuery(k=k))
+
+# Left as a plain def: a rebuild is long and blocking, so it belongs in the threadpool.
+@app.post("/admin/rebuild")
+def rebuild(source: Literal["write", "events"] = "write", x_admin_token: Optional[str] = Header(None)):
+    if not config.ADMIN_TOKEN or not hmac.compare_digest((x_admin_token or "").encode(), config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if config.READ_DB_BACKEND != "memory":
+        raise HTTPException(status_code=409, detail="Only the in-memory read model can be rebuilt")
+    if source == "events" and not event_store:
+        raise HTTPException(status_code=409, detail="No event store is configured")
+    if not rebuild_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A rebuild is already running")
+    try:
+        return rebuild_read_model(source)
+    finally:
+        rebuild_lock.release()
+
+if metrics:
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics_endpoint():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
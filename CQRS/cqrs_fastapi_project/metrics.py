@@ -0,0 +1,137 @@
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, List, Tuple
+
+# Upper bounds in seconds, from 10us to 1s; in-memory stages sit at the low end.
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+class Metrics:
+    # Timing is added by wrapping callables when the app starts. With metrics
+    # disabled nothing is wrapped, so the request path runs unchanged code.
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        # Counters and gauges owned elsewhere, read when /metrics is scraped.
+        self._callbacks: Dict[str, Tuple[str, Dict[Labels, Callable[[], float]]]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+        return histogram
+
+    def callback(self, name: str, kind: str, read: Callable[[], float], **labels: str):
+        with self._lock:
+            self._callbacks.setdefault(name, (kind, {}))[1][tuple(sorted(labels.items()))] = read
+
+    def timed(self, fn: Callable, name: str, **labels: str) -> Callable:
+        observe = self.histogram(name, **labels).observe
+        clock = time.perf_counter
+
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    observe(clock() - start)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(clock() - start)
+        return wrapper
+
+    def instrument(self, obj, method: str, name: str, **labels: str):
+        setattr(obj, method, self.timed(getattr(obj, method), name, **labels))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            series = {name: dict(by_labels) for name, by_labels in self._histograms.items()}
+            callbacks = {name: (kind, dict(by_labels)) for name, (kind, by_labels) in self._callbacks.items()}
+        for name, by_labels in sorted(series.items()):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(by_labels.items()):
+                with histogram._lock:
+                    counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+                base = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+                sep = "," if base else ""
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{base}{sep}le="+Inf"}} {count}')
+                lines.append(f"{name}_sum{{{base}}} {total}")
+                lines.append(f"{name}_count{{{base}}} {count}")
+        for name, (kind, by_labels) in sorted(callbacks.items()):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, read in sorted(by_labels.items(), key=lambda item: item[0]):
+                base = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+                lines.append(f"{name}{{{base}}} {read()}")
+        return "\n".join(lines) + "\n"
+
+class RequestTimingMiddleware:
+    # Plain ASGI middleware, timed until the response is fully sent and
+    # labelled with the route template rather than the raw path.
+    def __init__(self, app, metrics: Metrics, name: str = "cqrs_request_seconds"):
+        self.app = app
+        self.metrics = metrics
+        self.name = name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            self.metrics.histogram(self.name, method=scope["method"], route=path).observe(time.perf_counter() - start)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,8 +1,18 @@
-from pydantic import BaseModel
-from typing import List, Literal
+from pydantic import BaseModel, ConfigDict
+from typing import Literal, Optional, Tuple
+
+OrderStatus = Literal["CREATED", "CONFIRMED", "CANCELLED"]
 
 class Order(BaseModel):
+    # Frozen so the write model, the read model and in-process events can
+    # share one instance safely.
+    model_config = ConfigDict(frozen=True)
+
     id: str
     customer: str
-    items: List[str]
-    status: Literal["CREATED", "CONFIRMED", "CANCELLED"] = "CREATED"
+    items: Tuple[str, ...]
+    status: OrderStatus = "CREATED"
+    version: int = 1
+    # Unix time the command side accepted the order; None for orders stored
+    # before creation times were recorded.
+    created_at: Optional[float] = None
@@ -1,12 +1,134 @@
+import asyncio
+from typing import Callable
 from db.read_db import ReadDB
-from query.queries import GetOrderByIdQuery, GetAllOrdersQuery
+from db.search_db import OrderSearchDB
+from db.stats_db import OrderStatsDB
+from query.queries import (
+    GetOrderByIdQuery,
+    GetAllOrdersQuery,
+    GetOrdersByCustomerQuery,
+    GetOrdersByStatusQuery,
+    GetOrdersByItemQuery,
+    GetOrdersCreatedBetweenQuery,
+    GetLatestOrdersQuery,
+    GetCustomerOrderCountQuery,
+    GetStatusCountsQuery,
+    GetTopItemsQuery,
+    SearchOrdersQuery,
+)
 
 class OrderQueryHandler:
     def __init__(self, db: ReadDB):
         self.db = db
 
-    def handle_get_all(self, _: GetAllOrdersQuery):
-        return self.db.get_all()
+    def handle_get_all(self, query: GetAllOrdersQuery):
+        if query.limit is None and query.after is None:
+            return self.db.get_all()
+        return self.db.get_page(query.after, query.limit)
+
+    def handle_stream_all(self, query: GetAllOrdersQuery):
+        return self.db.iter_from(query.after)
 
     def handle_get_by_id(self, query: GetOrderByIdQuery):
         return self.db.get_by_id(query.id)
+
+    def handle_get_json_by_id(self, query: GetOrderByIdQuery):
+        return self.db.get_json(query.id)
+
+    def handle_get_by_customer(self, query: GetOrdersByCustomerQuery):
+        return self.db.get_by_customer(query.customer)
+
+    def handle_get_by_status(self, query: GetOrdersByStatusQuery):
+        return self.db.get_by_status(query.status)
+
+    def handle_get_by_item(self, query: GetOrdersByItemQuery):
+        return self.db.get_by_item(query.item)
+
+    def handle_get_created_between(self, query: GetOrdersCreatedBetweenQuery):
+        return self.db.get_created_between(query.since, query.until, query.limit)
+
+    def handle_get_latest(self, query: GetLatestOrdersQuery):
+        return self.db.get_latest(query.n)
+
+class AsyncOrderQueryHandler(OrderQueryHandler):
+    # Lookups on an in-memory read model are answered inline on the event
+    # loop; set offload for stores that block on disk or locks.
+    def __init__(self, db: ReadDB, offload: bool = False):
+        super().__init__(db)
+        self.offload = offload
+
+    async def handle_get_all(self, query: GetAllOrdersQuery):
+        return await self._run(super().handle_get_all, query)
+
+    async def handle_stream_all(self, query: GetAllOrdersQuery):
+        return await self._run(super().handle_stream_all, query)
+
+    async def handle_get_by_id(self, query: GetOrderByIdQuery):
+        return await self._run(super().handle_get_by_id, query)
+
+    async def handle_get_json_by_id(self, query: GetOrderByIdQuery):
+        return await self._run(super().handle_get_json_by_id, query)
+
+    async def handle_get_by_customer(self, query: GetOrdersByCustomerQuery):
+        return await self._run(super().handle_get_by_customer, query)
+
+    async def handle_get_by_status(self, query: GetOrdersByStatusQuery):
+        return await self._run(super().handle_get_by_status, query)
+
+    async def handle_get_by_item(self, query: GetOrdersByItemQuery):
+        return await self._run(super().handle_get_by_item, query)
+
+    async def handle_get_created_between(self, query: GetOrdersCreatedBetweenQuery):
+        return await self._run(super().handle_get_created_between, query)
+
+    async def handle_get_latest(self, query: GetLatestOrdersQuery):
+        return await self._run(super().handle_get_latest, query)
+
+    async def _run(self, handle: Callable, query):
+        if self.offload:
+            return await asyncio.to_thread(handle, query)
+        return handle(query)
+
+class OrderStatsQueryHandler:
+    def __init__(self, db: OrderStatsDB):
+        self.db = db
+
+    def handle_customer_count(self, query: GetCustomerOrderCountQuery):
+        return {"customer": query.customer, "orders": self.db.customer_count(query.customer)}
+
+    def handle_status_counts(self, _: GetStatusCountsQuery):
+        return self.db.statuses()
+
+    def handle_top_items(self, query: GetTopItemsQuery):
+        return [{"item": item, "count": count} for item, count in self.db.top(query.k)]
+
+class OrderSearchQueryHandler:
+    # The index returns ids; the orders come from the read model behind
+    # orders, so they show its current status and survive a rebuild.
+    def __init__(self, db: OrderSearchDB, orders: OrderQueryHandler):
+        self.db = db
+        self.orders = orders
+
+    def handle_search(self, query: SearchOrdersQuery):
+        return self._resolve(self.db.search(query.q, query.limit))
+
+    def _resolve(self, hits):
+        read_db = self.orders.db
+        results = []
+        for order_id, score in hits:
+            order = read_db.get_by_id(order_id)
+            # With bus workers the read model can briefly lag the index.
+            if order is not None:
+                results.append({**order.model_dump(), "score": score})
+        return results
+
+class AsyncOrderSearchQueryHandler(OrderSearchQueryHandler):
+    def __init__(self, db: OrderSearchDB, orders: OrderQueryHandler, offload: bool = False):
+        super().__init__(db, orders)
+        self.offload = offload
+
+    async def handle_search(self, query: SearchOrdersQuery):
+        hits = self.db.search(query.q, query.limit)
+        if self.offload:
+            return await asyncio.to_thread(self._resolve, hits)
+        return self._resolve(hits)
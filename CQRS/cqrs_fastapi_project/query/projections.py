@@ -0,0 +1,125 @@
+import threading
+from typing import Callable, List, Optional, Union
+from db.read_db import ReadDB
+from db.search_db import OrderSearchDB
+from db.stats_db import OrderStatsDB
+from events.bus import EventBus
+from events.events import DomainEvent, TrustedEvent, ORDER_CREATED, ORDERS_CREATED, ORDER_STATUS_CHANGED
+from models.order import Order
+
+Event = Union[DomainEvent, TrustedEvent]
+
+class ReadModelProjection:
+    def __init__(self, db: ReadDB):
+        self.db = db
+        self._lock = threading.Lock()
+        # Events seen while a replacement store is being built, replayed onto
+        # it by swap() so the rebuild misses nothing published meanwhile.
+        self._pending: Optional[List[Event]] = None
+
+    def subscribe(self, bus: EventBus, blocking: bool = False):
+        bus.subscribe(ORDER_CREATED, self.on_order_created, blocking=blocking)
+        bus.subscribe(ORDERS_CREATED, self.on_orders_created, blocking=blocking)
+        bus.subscribe(ORDER_STATUS_CHANGED, self.on_status_changed, blocking=blocking)
+
+    def start_buffering(self):
+        with self._lock:
+            self._pending = []
+
+    def stop_buffering(self):
+        with self._lock:
+            self._pending = None
+
+    def swap(self, db: ReadDB):
+        with self._lock:
+            for apply, event in self._pending or ():
+                apply(db, event)
+            self.db = db
+            self._pending = None
+
+    def on_order_created(self, event: Event):
+        self._dispatch(self._order_created, event)
+
+    def on_orders_created(self, event: Event):
+        self._dispatch(self._orders_created, event)
+
+    def on_status_changed(self, event: Event):
+        self._dispatch(self._status_changed, event)
+
+    def _dispatch(self, apply: Callable, event: Event):
+        # A handler that sees no buffer either ran before the rebuild read its
+        # source, which already holds the change, or after swap() installed
+        # the new store.
+        if self._pending is None:
+            apply(self.db, event)
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((apply, event))
+            db = self.db
+        apply(db, event)
+
+    @staticmethod
+    def _order_created(db: ReadDB, event: Event):
+        if isinstance(event, TrustedEvent):
+            db.update(event.model)
+        else:
+            db.update(Order(**event.payload))
+
+    @staticmethod
+    def _orders_created(db: ReadDB, event: Event):
+        if isinstance(event, TrustedEvent):
+            db.update_many(event.model["orders"])
+        else:
+            db.update_many(Order(**data) for data in event.payload["orders"])
+
+    @staticmethod
+    def _status_changed(db: ReadDB, event: Event):
+        delta = event.payload
+        db.set_status(delta["id"], delta["status"], delta["version"])
+
+class StatsProjection:
+    def __init__(self, db: OrderStatsDB):
+        self.db = db
+
+    def subscribe(self, bus: EventBus):
+        bus.subscribe(ORDER_CREATED, self.on_order_created)
+        bus.subscribe(ORDERS_CREATED, self.on_orders_created)
+        bus.subscribe(ORDER_STATUS_CHANGED, self.on_status_changed)
+
+    def on_order_created(self, event: Event):
+        if isinstance(event, TrustedEvent):
+            self.db.add(event.model)
+        else:
+            self.db.add(Order(**event.payload))
+
+    def on_orders_created(self, event: Event):
+        if isinstance(event, TrustedEvent):
+            self.db.add_many(event.model["orders"])
+        else:
+            self.db.add_many(Order(**data) for data in event.payload["orders"])
+
+    def on_status_changed(self, event: Event):
+        delta = event.payload
+        self.db.set_status(delta["id"], delta["status"], delta["version"])
+
+class SearchProjection:
+    # Status changes don't touch the indexed words, so only creations are consumed.
+    def __init__(self, db: OrderSearchDB):
+        self.db = db
+
+    def subscribe(self, bus: EventBus):
+        bus.subscribe(ORDER_CREATED, self.on_order_created)
+        bus.subscribe(ORDERS_CREATED, self.on_orders_created)
+
+    def on_order_created(self, event: Event):
+        if isinstance(event, TrustedEvent):
+            self.db.add(event.model)
+        else:
+            self.db.add(Order(**event.payload))
+
+    def on_orders_created(self, event: Event):
+        if isinstance(event, TrustedEvent):
+            self.db.add_many(event.model["orders"])
+        else:
+            self.db.add_many(Order(**data) for data in event.payload["orders"])
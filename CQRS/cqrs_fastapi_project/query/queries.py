@@ -1,7 +1,40 @@
 from pydantic import BaseModel
+from typing import Optional
+from models.order import OrderStatus
 
 class GetOrderByIdQuery(BaseModel):
     id: str
 
 class GetAllOrdersQuery(BaseModel):
+    limit: Optional[int] = None
+    after: Optional[str] = None
+
+class GetOrdersByCustomerQuery(BaseModel):
+    customer: str
+
+class GetOrdersByStatusQuery(BaseModel):
+    status: OrderStatus
+
+class GetOrdersByItemQuery(BaseModel):
+    item: str
+
+class GetOrdersCreatedBetweenQuery(BaseModel):
+    since: Optional[float] = None
+    until: Optional[float] = None
+    limit: Optional[int] = None
+
+class GetLatestOrdersQuery(BaseModel):
+    n: int = 20
+
+class GetCustomerOrderCountQuery(BaseModel):
+    customer: str
+
+class GetStatusCountsQuery(BaseModel):
     pass
+
+class GetTopItemsQuery(BaseModel):
+    k: int = 10
+
+class SearchOrdersQuery(BaseModel):
+    q: str
+    limit: int = 20
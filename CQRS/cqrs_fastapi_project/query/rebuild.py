@@ -0,0 +1,35 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Iterable, List
+from pydantic import TypeAdapter
+from models.order import Order
+from db.sharded import ShardedReadDB, group_by_shard
+
+_ORDERS = TypeAdapter(List[Order])
+
+def _build_partition(factory: Callable, data: bytes):
+    db = factory()
+    db.update_many(_ORDERS.validate_json(data))
+    return db
+
+def rebuild_read_db(orders: Iterable[Order], factory: Callable, partitions: int = 1, workers: int = 0):
+    # Orders are split with shard_of, so partition i is exactly shard i of a
+    # ShardedReadDB and keeps the insertion order of its orders.
+    groups = group_by_shard(orders, partitions)
+    if workers:
+        # Each partition travels to its worker as one JSON document and comes
+        # back as a pickled store. The factory must be picklable, and the store
+        # cheap to pickle, for this to beat building in-process.
+        with ProcessPoolExecutor(min(workers, partitions), mp_context=get_context("spawn")) as pool:
+            futures = [
+                pool.submit(_build_partition, factory, _ORDERS.dump_json(groups.get(i, [])))
+                for i in range(partitions)
+            ]
+            shards = [future.result() for future in futures]
+    else:
+        shards = []
+        for i in range(partitions):
+            shard = factory()
+            shard.update_many(groups.get(i, []))
+            shards.append(shard)
+    return shards[0] if partitions == 1 else ShardedReadDB.from_shards(shards)
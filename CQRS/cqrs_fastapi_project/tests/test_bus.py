@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+from db.read_db import ReadDB
+from db.sqlite_read_db import SQLiteReadDB
+from events.bus import AsyncEventBus, EventBus
+from events.events import DomainEvent, TrustedEvent, ORDER_CREATED, ORDERS_CREATED, ORDER_STATUS_CHANGED
+from models.order import Order
+from query.projections import ReadModelProjection
+
+ORDERS = 500
+
+def created(order_id: str) -> TrustedEvent:
+    return TrustedEvent(ORDER_CREATED, Order(id=order_id, customer="c", items=("x",)))
+
+def confirmed(order_id: str) -> DomainEvent:
+    return DomainEvent(type=ORDER_STATUS_CHANGED, payload={"id": order_id, "status": "CONFIRMED", "version": 2})
+
+def assert_all_confirmed(db, ids):
+    statuses = {order.id: order.status for order in db.get_all()}
+    assert statuses == {order_id: "CONFIRMED" for order_id in ids}
+
+def test_async_workers_apply_confirm_after_create(tmp_path):
+    db = SQLiteReadDB(str(tmp_path / "read.db"))
+    ids = [f"o{i}" for i in range(ORDERS)]
+
+    async def run():
+        bus = AsyncEventBus(workers=4)
+        ReadModelProjection(db).subscribe(bus, blocking=True)
+        for order_id in ids:
+            await bus.publish(created(order_id))
+            await bus.publish(confirmed(order_id))
+        await bus.close()
+
+    asyncio.run(run())
+    assert_all_confirmed(db, ids)
+    db.close()
+
+def test_async_workers_apply_confirm_after_batch():
+    db = ReadDB()
+    ids = [f"o{i}" for i in range(ORDERS)]
+    orders = [Order(id=order_id, customer="c", items=("x",)) for order_id in ids]
+
+    async def run():
+        bus = AsyncEventBus(workers=4, queue_size=8)
+
+        async def slow_create(event):
+            await asyncio.sleep(0.01)
+            ReadModelProjection(db).on_orders_created(event)
+
+        bus.subscribe(ORDERS_CREATED, slow_create)
+        bus.subscribe(ORDER_STATUS_CHANGED, ReadModelProjection(db).on_status_changed)
+        await bus.publish(TrustedEvent(ORDERS_CREATED, {"orders": orders}))
+        for order_id in ids:
+            await bus.publish(confirmed(order_id))
+        await bus.close()
+
+    asyncio.run(run())
+    assert_all_confirmed(db, ids)
+
+def test_thread_workers_apply_confirm_after_create():
+    db = ReadDB()
+    ids = [f"o{i}" for i in range(ORDERS)]
+    projection = ReadModelProjection(db)
+    bus = EventBus(workers=4)
+    delay = threading.local()
+
+    def slow_create(event):
+        # Every other create is slow, so without ordering its confirm would overtake it.
+        delay.flip = not getattr(delay, "flip", False)
+        if delay.flip:
+            time.sleep(0.001)
+        projection.on_order_created(event)
+
+    bus.subscribe(ORDER_CREATED, slow_create)
+    bus.subscribe(ORDER_STATUS_CHANGED, projection.on_status_changed)
+    for order_id in ids:
+        bus.publish(created(order_id))
+        bus.publish(confirmed(order_id))
+    bus.close()
+    assert_all_confirmed(db, ids)
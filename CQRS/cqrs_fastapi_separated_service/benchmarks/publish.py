@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from typing import Tuple
+from uuid import uuid4
+
+import requests
+
+from command_service.bus import EventBus
+
+def start_query_service(port: int) -> subprocess.Popen:
+    # The real query service in its own process, so the server doesn't
+    # compete with the client for the GIL.
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "query_service.main:app",
+        "--port", str(port), "--log-level", "warning", "--no-access-log",
+    ])
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            if time.monotonic() > deadline or server.poll() is not None:
+                server.kill()
+                raise RuntimeError("query service did not start")
+            time.sleep(0.1)
+
+def payload() -> dict:
+    return {"id": str(uuid4()), "customer": "Alice", "items": ["pen", "notebook"], "status": "CREATED"}
+
+def per_event(label: str, events: int, elapsed: Tuple[float, float]):
+    wall, cpu = elapsed
+    print(f"  {label:<34} {wall * 1e6 / events:9.1f} us/event {cpu * 1e6 / events:9.1f} us CPU/event")
+
+# Wall time, and CPU time spent on the command side only; the query
+# service runs in another process.
+def timed(fn, *args) -> Tuple[float, float]:
+    start, start_cpu = time.perf_counter(), time.process_time()
+    fn(*args)
+    return time.perf_counter() - start, time.process_time() - start_cpu
+
+def unpooled(url: str, events: int):
+    # What EventBus.publish used to do: a new connection for every event.
+    for _ in range(events):
+        requests.post(f"{url}/events", json={"type": "ORDER_CREATED", "payload": payload()}, timeout=2)
+
+def pooled(bus: EventBus, events: int):
+    for _ in range(events):
+        bus.publish("ORDER_CREATED", payload())
+
+async def pooled_async(bus: EventBus, events: int, concurrency: int) -> Tuple[float, float]:
+    async def worker(count: int):
+        for _ in range(count):
+            await bus.publish_async("ORDER_CREATED", payload())
+    start, start_cpu = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(worker(events // concurrency) for _ in range(concurrency)))
+    return time.perf_counter() - start, time.process_time() - start_cpu
+
+async def run_async(bus: EventBus, events: int, concurrency: int) -> Tuple[float, float]:
+    await pooled_async(bus, concurrency, concurrency)
+    try:
+        return await pooled_async(bus, events, concurrency)
+    finally:
+        await bus.aclose()
+
+def run(url: str, args):
+    bus = EventBus(url)
+    # Warm up both paths so opening the first pooled connections isn't counted.
+    unpooled(url, 10)
+    pooled(bus, 10)
+    print(f"{args.events} events")
+    per_event("requests.post (new connection)", args.events, timed(unpooled, url, args.events))
+    per_event("EventBus.publish (keep-alive)", args.events, timed(pooled, bus, args.events))
+    events = args.events // args.concurrency * args.concurrency
+    per_event(f"EventBus.publish_async (x{args.concurrency})", events,
+              asyncio.run(run_async(bus, events, args.concurrency)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of delivering one event to the query service over HTTP.")
+    parser.add_argument("--events", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=8, help="in-flight events for the async client")
+    parser.add_argument("--port", type=int, default=8765, help="port for the query service")
+    args = parser.parse_args()
+
+    server = start_query_service(args.port)
+    try:
+        run(f"http://127.0.0.1:{args.port}", args)
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,63 @@
-import requests, json
+import requests
+from requests.adapters import HTTPAdapter
 
 class EventBus:
-    def __init__(self, query_service_url: str):
+    # Events go through one Session, so connections to the query service
+    # stay open (keep-alive) and each publish reuses one from the pool
+    # instead of connecting and tearing down. pool_size caps how many are
+    # kept; the sync endpoints run on a 40-thread pool, hence the default.
+    def __init__(self, query_service_url: str, pool_size: int = 40,
+                 connect_timeout: float = 1.0, read_timeout: float = 2.0):
         self.query_service_url = query_service_url
+        self.events_url = f"{query_service_url}/events"
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._async_client = None
 
     def publish(self, event_type: str, payload: dict):
-        event = {"type": event_type, "payload": payload}
         try:
-            requests.post(f"{self.query_service_url}/events", json=event, timeout=2)
+            self.deliver(event_type, payload)
         except requests.exceptions.RequestException:
-            print("Failed to deliver event, will retry later.")
+            print("Failed to deliver event.")
+
+    def deliver(self, event_type: str, payload: dict):
+        # Like publish, but raises unless the query service acknowledged the event.
+        event = {"type": event_type, "payload": payload}
+        response = self.session.post(self.events_url, json=event, timeout=(self.connect_timeout, self.read_timeout))
+        response.raise_for_status()
+
+    async def publish_async(self, event_type: str, payload: dict):
+        # For async callers; needs httpx, which is only imported on first use.
+        import httpx
+        try:
+            await self.deliver_async(event_type, payload)
+        except httpx.HTTPError:
+            print("Failed to deliver event.")
+
+    async def deliver_async(self, event_type: str, payload: dict):
+        event = {"type": event_type, "payload": payload}
+        response = await self._client().post(self.events_url, json=event)
+        response.raise_for_status()
+
+    def _client(self):
+        if self._async_client is None:
+            import httpx
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            )
+        return self._async_client
+
+    def close(self):
+        self.session.close()
+
+    async def aclose(self):
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
@@ -1,16 +1,19 @@
 from .models import Order
 from .db import WriteDB
-from .bus import EventBus
+from .outbox import Outbox
 from .commands import CreateOrderCommand
 
 ORDER_CREATED = "ORDER_CREATED"
 
 class CommandHandler:
-    def __init__(self, db: WriteDB, bus: EventBus):
+    def __init__(self, db: WriteDB, outbox: Outbox):
         self.db = db
-        self.bus = bus
+        self.outbox = outbox
 
     def handle_create_order(self, command: CreateOrderCommand):
+        # The event is stored before the order, so an order is only saved
+        # once its event is sure to reach the query service. Delivery is left
+        # to the OutboxFlusher, off the request path.
         order = Order(**command.dict())
+        self.outbox.add(ORDER_CREATED, order.dict())
         self.db.save(order)
-        self.bus.publish(ORDER_CREATED, order.dict())
@@ -1,7 +1,9 @@
+import asyncio
 from fastapi import FastAPI
 from uuid import uuid4
 from .db import WriteDB
 from .bus import EventBus
+from .outbox import Outbox, OutboxFlusher
 from .handlers import CommandHandler
 from .commands import CreateOrderCommand
 
@@ -9,7 +11,22 @@ app = FastAPI(title="Command Service")
 
 db = WriteDB()
 bus = EventBus("http://localhost:8001")
-handler = CommandHandler(db, bus)
+outbox = Outbox("outbox.db")
+flusher = OutboxFlusher(outbox, bus)
+handler = CommandHandler(db, outbox)
+
+@app.on_event("startup")
+def startup_event():
+    flusher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Joining the flusher blocks, so it runs off the event loop. If it hasn't
+    # stopped, the outbox and session are left open for it; the process is
+    # exiting anyway.
+    if await asyncio.to_thread(flusher.stop):
+        outbox.close()
+        await bus.aclose()
 
 @app.post("/orders")
 def create_order(payload: dict):
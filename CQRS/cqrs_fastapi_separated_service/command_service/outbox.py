@@ -0,0 +1,127 @@
+import json
+import sqlite3
+import threading
+from typing import Iterable, List, Tuple
+
+import requests
+
+from .bus import EventBus
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL
+)
+"""
+
+class Outbox:
+    # Events not yet acknowledged by the query service, kept in SQLite so
+    # they outlive the process. They are read back in the order they were
+    # added and deleted once delivered. With fsync off a commit survives the
+    # process crashing but not the machine losing power.
+    def __init__(self, path: str, fsync: bool = False):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+        self._conn.execute(SCHEMA)
+        self._lock = threading.Lock()
+        # Set on every add, so the flusher wakes up instead of polling.
+        self.added = threading.Event()
+
+    def add(self, event_type: str, payload: dict):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO outbox (type, payload) VALUES (?, ?)", (event_type, json.dumps(payload)))
+        self.added.set()
+
+    def peek(self, limit: int) -> List[Tuple[int, str, dict]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT seq, type, payload FROM outbox ORDER BY seq LIMIT ?", (limit,)).fetchall()
+        return [(seq, event_type, json.loads(payload)) for seq, event_type, payload in rows]
+
+    def remove(self, seqs: Iterable[int]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in seqs])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class OutboxFlusher:
+    # Delivers outbox events from a background thread, oldest first. When
+    # delivery fails it waits base_delay, doubling up to max_delay, and then
+    # retries the same event, so the query service still gets events in
+    # order. An event can be delivered twice if the process dies between the
+    # acknowledgement and the delete; the query service stores orders by id,
+    # so a repeat is harmless.
+    def __init__(self, outbox: Outbox, bus: EventBus, batch_size: int = 100,
+                 base_delay: float = 0.5, max_delay: float = 30.0, idle_wait: float = 1.0):
+        self.outbox = outbox
+        self.bus = bus
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_wait = idle_wait
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        # False if the thread is still running after timeout, e.g. stuck in
+        # a delivery; it is a daemon thread and still uses the outbox.
+        self._stopping.set()
+        self.outbox.added.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return False
+            self._thread = None
+        return True
+
+    def flush(self) -> bool:
+        # Delivers until the outbox is empty; False if a delivery failed.
+        while not self._stopping.is_set():
+            events = self.outbox.peek(self.batch_size)
+            if not events:
+                return True
+            delivered: List[int] = []
+            try:
+                for seq, event_type, payload in events:
+                    try:
+                        self.bus.deliver(event_type, payload)
+                    except requests.HTTPError as e:
+                        if not _rejected(e.response):
+                            raise
+                        # Sending it again would be rejected again; drop it
+                        # rather than hold up every event behind it.
+                        print(f"Query service rejected event {seq}, dropping it: {e}")
+                    delivered.append(seq)
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to deliver event, will retry: {e}")
+                return False
+            finally:
+                self.outbox.remove(delivered)
+        return True
+
+    def _run(self):
+        delay = 0.0
+        while not self._stopping.is_set():
+            self.outbox.added.clear()
+            if self.flush():
+                delay = 0.0
+                self.outbox.added.wait(self.idle_wait)
+            else:
+                delay = min(self.max_delay, delay * 2 if delay else self.base_delay)
+                self._stopping.wait(delay)
+
+def _rejected(response) -> bool:
+    # A 4xx answer means the event itself is bad, except for timeouts and rate limits.
+    return response is not None and 400 <= response.status_code < 500 and response.status_code not in (408, 429)
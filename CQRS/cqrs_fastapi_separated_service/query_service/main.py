@@ -1,4 +1,5 @@
 from fastapi import FastAPI, HTTPException
+from pydantic import ValidationError
 from .db import ReadDB
 from .handlers import EventHandler
 from .events import DomainEvent
@@ -11,7 +12,10 @@ event_handler = EventHandler(db)
 
 @app.post("/events")
 def receive_event(event: DomainEvent):
-    event_handler.handle(event)
+    try:
+        event_handler.handle(event)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
     return {"received": event.type}
 
 @app.get("/orders")
@@ -1,15 +1,22 @@
 import json
 import asyncio
+from typing import List
 from aiokafka import AIOKafkaConsumer
 from handlers import EventHandler
 from events import DomainEvent
 
 class KafkaEventConsumer:
-    def __init__(self, topic: str, handler: EventHandler, bootstrap_servers: str = "localhost:9092"):
+    def __init__(self, topic: str, handler: EventHandler, bootstrap_servers: str = "localhost:9092",
+                 max_batch: int = 500, batch_timeout_ms: int = 100):
         self.topic = topic
         self.handler = handler
         self.bootstrap_servers = bootstrap_servers
+        # Each fetched batch becomes one read model snapshot, so larger
+        # batches mean fewer copies of the read model under heavy ingestion.
+        self.max_batch = max_batch
+        self.batch_timeout_ms = batch_timeout_ms
         self.consumer: AIOKafkaConsumer | None = None
+        self._task: asyncio.Task | None = None
 
     async def start(self):
         self.consumer = AIOKafkaConsumer(
@@ -20,22 +27,40 @@ class KafkaEventConsumer:
             enable_auto_commit=True
         )
         await self.consumer.start()
-        asyncio.create_task(self.consume_loop())
+        self._task = asyncio.create_task(self.consume_loop())
 
     async def stop(self):
+        # The task can only be cancelled while it awaits the next fetch, so a
+        # batch being applied is finished first.
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
         if self.consumer:
             await self.consumer.stop()
 
     async def consume_loop(self):
         assert self.consumer
-        async for msg in self.consumer:
-            if not msg.value:
+        while True:
+            batches = await self.consumer.getmany(timeout_ms=self.batch_timeout_ms, max_records=self.max_batch)
+            events: List[DomainEvent] = []
+            for messages in batches.values():
+                for msg in messages:
+                    if not msg.value:
+                        continue
+                    try:
+                        events.append(DomainEvent(**msg.value))
+                    except Exception as e:
+                        print(f"[ERROR] Failed to process message: {e}")
+            if not events:
                 continue
             try:
-                event = DomainEvent(**msg.value)
-                self.handler.handle(event)
+                self.handler.handle_batch(events)
             except Exception as e:
-                print(f"[ERROR] Failed to process message: {e}")
+                print(f"[ERROR] Failed to process batch: {e}")
 
     @staticmethod
     def safe_deserializer(v: bytes):
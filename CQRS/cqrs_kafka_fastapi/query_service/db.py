@@ -1,15 +1,55 @@
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 from models import Order
 
 class ReadDB:
+    # Readers use whichever view is current: a list of orders and how many
+    # of them are visible. Entries inside a published view are never changed,
+    # so reads take no lock and never see a batch half applied.
+    #
+    # A batch of new orders is appended past the visible count and then
+    # published with a new count, so it costs O(batch). A batch that changes
+    # an order already stored copies the list first, which costs O(total
+    # orders); only ORDER_CREATED is consumed, so that happens only when a
+    # redelivered event differs from the stored order. Exact repeats are skipped.
     def __init__(self):
-        self.orders: Dict[str, Order] = {}
+        self._view: Tuple[List[Order], int] = ([], 0)
+        # Position of each order in the list. An id is added here before its
+        # order is visible, so readers check it against the count.
+        self._positions: Dict[str, int] = {}
+        self._write_lock = threading.Lock()
 
     def update(self, order: Order):
-        self.orders[order.id] = order
+        self.update_many((order,))
+
+    def update_many(self, orders: Iterable[Order]):
+        with self._write_lock:
+            current, count = self._view
+            changed: Dict[int, Order] = {}
+            for order in orders:
+                position = self._positions.get(order.id)
+                if position is None:
+                    self._positions[order.id] = count
+                    current.append(order)
+                    count += 1
+                elif position >= self._view[1]:
+                    # Added earlier in this batch, so not visible yet.
+                    current[position] = order
+                elif current[position] != order:
+                    changed[position] = order
+            if changed:
+                current = current[:count]
+                for position, order in changed.items():
+                    current[position] = order
+            self._view = (current, count)
 
     def get_all(self) -> List[Order]:
-        return list(self.orders.values())
+        orders, count = self._view
+        return orders[:count]
 
     def get_by_id(self, order_id: str) -> Optional[Order]:
-        return self.orders.get(order_id)
+        orders, count = self._view
+        position = self._positions.get(order_id)
+        if position is None or position >= count:
+            return None
+        return orders[position]
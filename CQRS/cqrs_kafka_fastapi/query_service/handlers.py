@@ -1,3 +1,5 @@
+from typing import Iterable, List
+from pydantic import ValidationError
 from models import Order
 from db import ReadDB
 from events import DomainEvent, ORDER_CREATED
@@ -7,6 +9,18 @@ class EventHandler:
         self.db = db
 
     def handle(self, event: DomainEvent):
-        if event.type == ORDER_CREATED:
-            order = Order(**event.payload)
-            self.db.update(order)
+        self.handle_batch((event,))
+
+    def handle_batch(self, events: Iterable[DomainEvent]):
+        # Invalid payloads are skipped, so one bad event doesn't cost the
+        # rest of the batch its snapshot.
+        orders: List[Order] = []
+        for event in events:
+            if event.type != ORDER_CREATED:
+                continue
+            try:
+                orders.append(Order(**event.payload))
+            except ValidationError as e:
+                print(f"[ERROR] Failed to process message: {e}")
+        if orders:
+            self.db.update_many(orders)